@@ -0,0 +1,601 @@
+import heapq
+import sys
+import time
+
+from profiler import percentile
+from simulation import (SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE, FPS, LANE_ROAD, LANE_RIVER,
+                        ACTION_NONE, ACTION_UP, ACTION_DOWN, ACTION_LEFT, ACTION_RIGHT, ACTION_MOVES,
+                        LaneManager, World, safe_windows)
+
+# This file contains the autopilot: a bot that plans the chicken's hops a few lanes ahead.
+# It searches a time-expanded grid (tick, row, x) with A*, using the closed-form obstacle motion
+# from LaneManager.get_obstacle_motion, so it never clones or steps the world to look ahead.
+# Cars and logs that are scheduled to spawn (see Lane.get_spawn_schedule) are planned around too.
+# Each tick of the plan is checked the way World.step would: cars must not overlap the chicken,
+# rivers need a log under it (and the log carries it along).
+#
+# Plans are kept until they stop working. When a lane on the planned path spawns a new car or log,
+# the plan is re-checked against it and only searched again if it now fails.
+# Each act() call gets SEARCH_BUDGET_SECONDS, counted from the moment it is called, so checking
+# and switching plans uses it up too. A search that needs longer carries on over the next ticks
+# while the chicken plays its current plan (the next plan is searched for from where that one
+# ends) or waits where it is. Once waiting any longer would kill it, the search stops at the
+# deadline with the best plan found so far.
+# Run "python autopilot.py" to let it play a few seeded games headless.
+
+PLAN_ROWS = 5  # How many lanes ahead each plan tries to reach
+PLAN_HORIZON = FPS * 3  # Longest plan in ticks
+MAX_EXPANSIONS = 300  # Search nodes per plan before settling for the best partial plan
+RETRY_TICKS = FPS // 2  # How long to wait on grass before searching again when the way ahead is blocked
+SEARCH_BUDGET_SECONDS = 0.0005  # Time per act() call before the rest of a search is left for the next tick
+
+# Hops the planner tries at each decision point (waiting is tried separately)
+HOP_ACTIONS = (ACTION_UP, ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN)
+
+
+def hop_ticks(hop_speed):
+    """Count the ticks a hop takes, the same way Player.update adds up hop_progress"""
+    progress = 0
+    ticks = 0
+    while progress < 1.0:
+        progress += hop_speed
+        ticks += 1
+    return ticks
+
+
+class Autopilot:
+    """
+    Plans and plays hops for a World; call it once per tick for that tick's action
+
+    Can be used as a batch.py agent: autopilot(world, rng) -> ACTION_*. A new world (or a reset
+    one) is noticed automatically and starts a fresh plan.
+    """
+
+    def __init__(self, plan_rows=PLAN_ROWS, horizon=PLAN_HORIZON, max_expansions=MAX_EXPANSIONS,
+                 budget=SEARCH_BUDGET_SECONDS):
+        self.plan_rows = plan_rows
+        self.horizon = horizon
+        self.max_expansions = max_expansions
+        self.budget = budget  # Seconds per act() call (None = finish every search on the tick it starts)
+        self.lane_manager = None
+        self.plan = []  # (tick, action, row, x) decision points still to play, in tick order
+        self.plan_end = 0  # Tick the current plan runs until
+        self.plan_found = True  # Whether the current plan gets PLAN_ROWS lanes ahead
+        self.plan_rows_used = {}  # Row -> obstacle signature the current plan was checked against
+        self.motion = {}  # Row -> (tick, motion list, signature)
+        self.windows = {}  # (row, x) -> (signature, start, stop, safe windows) for road lanes
+        self.now = 0  # Lane tick the lane safety queries start from (a running search's start tick)
+        # Search in progress (a generator, see search), the lane tick it started on and the last
+        # tick the chicken can wait for it
+        self.searching = None
+        self.search_tick = 0
+        self.search_must_finish = 0
+        self.search_root = None  # Where it plans from, None for where the chicken is now
+        self.next_plan = None  # (plan, plan end, found) to follow the current plan with
+        self.ahead_pending = False  # Whether the search for the next plan waits for a tick with time left
+        self.deadline = None  # perf_counter time this act() call stops searching at (None = no limit)
+        self.plans = 0
+        self.ticks = 0
+
+    def reset(self, lane_manager):
+        """Forget everything about the previous world"""
+        self.lane_manager = lane_manager
+        self.plan = []
+        self.plan_end = 0
+        self.plan_rows_used = {}
+        self.motion = {}
+        self.windows = {}
+        self.searching = None
+        self.next_plan = None
+        self.ahead_pending = False
+        self.plan_found = True
+
+    def __call__(self, world, rng=None):
+        return self.act(world)
+
+    # Lane safety
+
+    def get_motion(self, row):
+        """Get (motion list, signature) for row, computed once per tick"""
+        tick = self.lane_manager.ticks
+        cached = self.motion.get(row)
+        if cached is not None and cached[0] == tick:
+            return cached[1], cached[2]
+        motion = self.lane_manager.get_obstacle_motion(row, scheduled=True)
+        # x - velocity * tick is the same on every tick for one obstacle, so the last scheduled
+        # obstacle's value only changes when something spawns (and another spawn is scheduled)
+        signature = None
+        if motion:
+            x, velocity, width, spawn_tick = motion[-1]
+            signature = x - velocity * spawn_tick
+        self.motion[row] = (tick, motion, signature)
+        return motion, signature
+
+    def road_windows(self, row, x):
+        """
+        Get the safe windows of a road cell from now to well past the planning horizon
+
+        Cached per (row, x) until something new spawns in the lane or the windows run short (or
+        a running search asks about ticks before they start).
+        """
+        motion, signature = self.get_motion(row)
+        now = self.now
+        cached = self.windows.get((row, x))
+        if cached is None or cached[0] != signature or not cached[1] <= now or cached[2] < now + self.horizon + FPS:
+            stop = now + self.horizon * 2
+            cached = (signature, now, stop, safe_windows(LANE_ROAD, motion, x, x + TILE_SIZE, now, stop))
+            self.windows[(row, x)] = cached
+        return cached[3]
+
+    def log_velocity(self, row, x, tick):
+        """Get the velocity of the log the chicken at x stands on at lane tick `tick`, None if there is none"""
+        # The oldest log under the chicken carries it, like LaneManager.handle_river_logic
+        motion, signature = self.get_motion(row)
+        for log_x, velocity, width, spawn_tick in motion:
+            position = log_x + velocity * (tick - spawn_tick)
+            if position < x + TILE_SIZE and x < position + width:
+                return velocity
+        return None
+
+    def survive_ticks(self, row, x, tick, ticks):
+        """
+        Simulate the chicken standing in (row, x) through lane ticks tick + 1 .. tick + ticks
+
+        Returns the chicken's x afterwards (logs carry it), or None if it would die. Each lane type
+        is answered in closed form: a road from its safe windows, a river from the log under the
+        chicken on the first tick (it moves with the log, so it stays on it until it reaches the
+        edge of the screen).
+        """
+        if ticks <= 0:
+            return x
+        lane = self.lane_manager.rows.get(row)
+        if lane is None or (lane.type != LANE_ROAD and lane.type != LANE_RIVER):
+            return x
+        if lane.type == LANE_ROAD:
+            for first, last in self.road_windows(row, x):
+                if first <= tick + 1 < last:
+                    return x if tick + ticks < last else None
+            return None
+
+        velocity = self.log_velocity(row, x, tick + 1)
+        if velocity is None:
+            return None
+        x += velocity * ticks
+        if x < 0 or x + TILE_SIZE > SCREEN_WIDTH:
+            return None
+        return x
+
+    # Planning
+
+    def hop_target(self, action, row, x):
+        """Get (row, x) after a hop, or None if the hop is not allowed"""
+        dx, dy = ACTION_MOVES[action]
+        x += dx * TILE_SIZE
+        row += dy
+        if dx and not 0 <= x <= SCREEN_WIDTH - TILE_SIZE:
+            return None  # Player.move ignores it
+        if dy > 0:
+            # Keep well clear of the bottom of the screen (the camera never scrolls back down)
+            y = self.lane_manager.start_y + row * TILE_SIZE
+            if y - self.lane_manager.camera_y > SCREEN_HEIGHT - TILE_SIZE * 3:
+                return None
+        return row, x
+
+    def is_resting(self, row):
+        """Check if the chicken can wait in row for as long as it likes"""
+        lane = self.lane_manager.rows.get(row)
+        return lane is None or (lane.type != LANE_ROAD and lane.type != LANE_RIVER)
+
+    def is_river(self, row):
+        lane = self.lane_manager.rows.get(row)
+        return lane is not None and lane.type == LANE_RIVER
+
+    def cell_windows(self, row, x, stop):
+        """Get the safe windows of a cell the chicken stands still in (grass or road)"""
+        if self.is_resting(row):
+            return [(self.now, stop)]
+        return self.road_windows(row, x)
+
+    def state_key(self, row, x, tick):
+        """
+        Key under which search states are considered the same
+
+        Arriving earlier in a still cell is as good as arriving later while the chicken can wait
+        there in between: on grass always, on a road within the same safe window. On a river the
+        chicken rides along with the logs, so x - velocity * tick stays the same while it waits.
+        """
+        lane = self.lane_manager.rows.get(row)
+        if lane is None or (lane.type != LANE_ROAD and lane.type != LANE_RIVER):
+            return row, x
+        if lane.type == LANE_RIVER:
+            return row, x - lane.log_speed * lane.log_direction * tick
+        for first, last in self.road_windows(row, x):
+            if first <= tick < last:
+                return row, x, first
+        return row, x, tick
+
+    def latest_departure(self, row, x, tick, stop):
+        """Get the last tick the chicken in (row, x) at `tick` can still hop away on, and its drift per tick"""
+        if self.is_river(row):
+            velocity = self.log_velocity(row, x, tick + 1)
+            if velocity is None:
+                return tick, 0
+            # Carried towards the edge of the screen
+            if velocity > 0:
+                latest = tick + (SCREEN_WIDTH - TILE_SIZE - x) // velocity
+            else:
+                latest = tick + x // -velocity
+            return min(int(latest), stop), velocity
+        for first, last in self.cell_windows(row, x, stop):
+            if first <= tick + 1 < last:
+                return min(last - 1, stop), 0
+        return tick, 0
+
+    def departures(self, row, x, tick, action, hop, stop, latest, velocity):
+        """
+        Get the (tick, x) pairs worth starting a hop from (row, x) on
+
+        The chicken can wait until `latest` (drifting velocity pixels per tick on a log). For a
+        still target (grass or road) the earliest departure into each of its safe windows is
+        enough, since waiting there is as good as leaving later; for moving cases every tick
+        up to one hop ahead is tried.
+        """
+        target = self.hop_target(action, row, x)
+        if target is None:
+            return []
+        target_row, target_x = target
+        if velocity or self.is_river(target_row):
+            # Hopping sideways along a river lands on the same spot of the moving logs whenever
+            # the chicken leaves, so only leaving now counts
+            last = tick if velocity and target_row == row else min(latest, tick + hop)
+            departures = []
+            for depart in range(tick, last + 1):
+                depart_x = x + velocity * (depart - tick)
+                if not velocity or self.hop_target(action, row, depart_x) is not None:
+                    departures.append((depart, depart_x))
+            return departures
+
+        departures = []
+        for first, last in self.cell_windows(target_row, target_x, stop + hop):
+            # The hop needs ticks depart + 1 .. depart + hop safe in the target
+            depart = max(tick, first - 1)
+            if depart > latest:
+                break
+            if depart + hop <= last - 1:
+                departures.append((depart, x))
+        return departures
+
+    def search(self, world, root=None, lead=0):
+        """
+        A* over (tick, row, x) from root, returns (plan, tick the plan runs until, whether it gets there)
+
+        root is the (lane tick, row, x) to plan from, by default where the chicken is now (or lands,
+        if it is mid-hop). The plan is a list of (tick, action, row, x) hops. If no way PLAN_ROWS
+        lanes ahead is found, the plan goes to the furthest lane the chicken can wait on (grass), or
+        failing that survives for as long as possible. The chicken is taken to wait at the root for
+        `lead` ticks first (as long as it can), so a search spread over a few ticks doesn't plan
+        hops for ticks that are already over by the time it finishes.
+
+        This is a generator: it yields whenever self.deadline has passed, to be resumed with next()
+        on a later tick, and returns its result through StopIteration. It first yields the last tick
+        the chicken can wait for it, before doing any searching. Once that tick has come, it stops
+        at the deadline with the best plan among the states found so far.
+        """
+        player = world.player
+        hop = hop_ticks(player.hop_speed)
+        if root is None:
+            t0 = self.lane_manager.ticks
+            row0 = self.lane_manager.row_of(player.y)
+
+            # A hop still in the air has to land before the next one
+            start_tick = t0
+            x0 = player.x
+            if player.is_hopping:
+                remaining = hop_ticks(player.hop_speed) - int(round(player.hop_progress / player.hop_speed))
+                remaining = max(remaining, 1)
+                x0 = self.survive_ticks(row0, x0, t0, remaining)
+                if x0 is None:
+                    yield t0
+                    return [], t0 + remaining, False
+                start_tick = t0 + remaining
+        else:
+            start_tick, row0, x0 = root
+            t0 = start_tick
+        goal_row = row0 - self.plan_rows
+        stop = t0 + self.horizon
+
+        latest = self.latest_departure(row0, x0, start_tick, stop)[0]
+        wait = min(lead, latest - start_tick)
+        if wait > 0:
+            x0 = self.survive_ticks(row0, x0, start_tick, wait)
+            start_tick += wait
+            latest = self.latest_departure(row0, x0, start_tick, stop)[0]
+        must_finish = latest
+        yield must_finish
+
+        # Nodes are (tick, row, x, parent index, action, tick and x the hop started from);
+        # the heap holds (f, tick, index)
+        nodes = [(start_tick, row0, x0, -1, ACTION_NONE, start_tick, x0)]
+        heap = [(start_tick + hop * max(0, row0 - goal_row), start_tick, 0)]
+        seen = {(start_tick, row0, x0)}  # States generated
+        closed = set()  # State keys expanded
+        goal = None
+        stopped = False
+        best_rest = 0 if self.is_resting(row0) else None  # Furthest up (then soonest) on grass
+        best_survivor = 0  # Longest survived (then furthest up)
+        expansions = 0
+        while heap and expansions < self.max_expansions:
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                if self.lane_manager.ticks < must_finish:
+                    yield
+                elif expansions:
+                    stopped = True  # The chicken can't wait any longer, make do with what there is
+                    break
+                # else it has to get at least one step out of this search, whatever the deadline
+            f, tick, index = heapq.heappop(heap)
+            row, x = nodes[index][1:3]
+            key = self.state_key(row, x, tick)
+            if key in closed:
+                continue
+            closed.add(key)
+            if row <= goal_row or tick >= stop:
+                goal = index
+                break
+            if self.is_resting(row) and (best_rest is None or (row, tick) < nodes[best_rest][1::-1]):
+                best_rest = index
+            if (-tick, row) < (-nodes[best_survivor][0], nodes[best_survivor][1]):
+                best_survivor = index
+            expansions += 1
+
+            # Waiting is folded into the hops: each one can start on any tick until the chicken has
+            # to leave its cell (see departures). On a log, a wait of a whole hop keeps the search going.
+            latest, velocity = self.latest_departure(row, x, tick, stop)
+            successors = []
+            if velocity and latest > tick + hop:
+                successors.append((ACTION_NONE, tick + hop + 1, row, x + velocity * (hop + 1), tick, x))
+            for action in HOP_ACTIONS:
+                for depart, depart_x in self.departures(row, x, tick, action, hop, stop, latest, velocity):
+                    new_row, new_x = self.hop_target(action, row, depart_x)
+                    new_x = self.survive_ticks(new_row, new_x, depart, hop)
+                    if new_x is not None:
+                        successors.append((action, depart + hop, new_row, new_x, depart, depart_x))
+            for action, new_tick, new_row, new_x, depart, depart_x in successors:
+                key = (new_tick, new_row, new_x)
+                if key in seen:
+                    continue
+                seen.add(key)
+                nodes.append((new_tick, new_row, new_x, index, action, depart, depart_x))
+                heapq.heappush(heap, (new_tick + hop * max(0, new_row - goal_row), new_tick, len(nodes) - 1))
+
+        if stopped:
+            # Nodes not expanded yet are as safe up to their tick
+            for index, node in enumerate(nodes):
+                tick, row = node[:2]
+                if self.is_resting(row) and (best_rest is None or (row, tick) < nodes[best_rest][1::-1]):
+                    best_rest = index
+                if (-tick, row) < (-nodes[best_survivor][0], nodes[best_survivor][1]):
+                    best_survivor = index
+
+        if goal is not None:
+            best = goal
+            end = nodes[goal][0]
+        elif best_rest is not None:
+            # Wait there a little before looking again
+            best = best_rest
+            end = max(nodes[best_rest][0], t0 + RETRY_TICKS)
+        else:
+            best = best_survivor
+            end = nodes[best_survivor][0]
+
+        # Walk back from the chosen node, keeping the hops (waits need no action)
+        plan = []
+        index = best
+        while nodes[index][3] >= 0:
+            tick, row, x, parent, action, depart, depart_x = nodes[index]
+            if action != ACTION_NONE:
+                plan.append((depart, action, nodes[parent][1], depart_x))
+            index = parent
+        plan.reverse()
+        return plan, end, goal is not None
+
+    def follow_plan(self, world, plan, plan_end):
+        """
+        Re-simulate a plan from the current state against the current lanes
+
+        Returns the (tick, row, x) the chicken ends up in once the plan is over, or None if it
+        doesn't work anymore.
+        """
+        tick = self.lane_manager.ticks
+        row = self.lane_manager.row_of(world.player.y)
+        x = world.player.x
+        hop = hop_ticks(world.player.hop_speed)
+        for plan_tick, action, plan_row, plan_x in plan:
+            x = self.survive_ticks(row, x, tick, plan_tick - tick)
+            if x is None or (row, x) != (plan_row, plan_x):
+                return None
+            row, x = self.hop_target(action, row, x) or (row, x)
+            tick = plan_tick
+            x = self.survive_ticks(row, x, tick, hop)
+            if x is None:
+                return None
+            tick += hop
+        if plan_end <= tick:
+            return tick, row, x
+        x = self.survive_ticks(row, x, tick, plan_end - tick)
+        return None if x is None else (plan_end, row, x)
+
+    def check_plan(self, world):
+        """Re-simulate the rest of the plan against the current lanes, returns True if it still works"""
+        return self.follow_plan(world, self.plan, self.plan_end) is not None
+
+    def remember_rows(self, world):
+        """Store the obstacle signature of each row the plan passes through or looks at"""
+        row = self.lane_manager.row_of(world.player.y)
+        rows = set(range(row - self.plan_rows, row + 1))
+        for tick, action, row, x in self.plan:
+            rows.add(row)
+            rows.add(row + ACTION_MOVES[action][1])
+        self.plan_rows_used = {row: self.get_motion(row)[1] for row in rows}
+
+    def use_plan(self, world, plan, plan_end, found=True):
+        """
+        Switch to a plan and, if it gets where it was going, start searching for the one after it
+
+        That search runs while the chicken plays this plan, so the next plan is usually ready by
+        the time it's needed. After a plan that doesn't get PLAN_ROWS lanes ahead, act starts it
+        only RETRY_TICKS before the plan is over: logs that spawn after a search started aren't
+        known, so from far enough ahead a river can look empty.
+        """
+        self.plan = plan
+        self.plan_end = plan_end
+        self.plan_found = found
+        self.remember_rows(world)
+        self.next_plan = None
+        # Out of time, act starts it on the next tick instead
+        self.ahead_pending = found and self.deadline is not None and time.perf_counter() >= self.deadline
+        if found and not self.ahead_pending:
+            self.search_ahead(world)
+
+    def search_ahead(self, world):
+        """Start searching for the plan after the current one, from where it ends"""
+        self.ahead_pending = False
+        end = self.follow_plan(world, self.plan, self.plan_end)
+        if end is not None:
+            self.start_search(world, root=end)
+
+    def start_search(self, world, root=None, lead=0):
+        """Start searching for a plan from root (see search), right away unless continue_search is called"""
+        self.now = self.search_tick = self.lane_manager.ticks
+        self.searching = self.search(world, root, lead)
+        self.search_must_finish = next(self.searching)
+        self.search_root = root
+
+    def continue_search(self, world):
+        """
+        Search on until self.deadline, or until it is done
+
+        A search that planned ahead from the end of the current plan and finishes before that plan
+        is over is kept as the next plan (act only switches to it if it gets PLAN_ROWS lanes ahead,
+        otherwise it searches again from wherever the chicken is then). Any other search plans
+        from where the chicken is, and takes over straight away, unless it finished too late for
+        its first hop or something new spawned in the meantime and breaks it: then it searches
+        again, starting that much later (on this tick, within what is left of self.deadline, if
+        the chicken can't wait).
+        """
+        tick = self.lane_manager.ticks
+        while True:
+            self.now = self.search_tick
+            try:
+                next(self.searching)
+                return
+            except StopIteration as done:
+                plan, plan_end, found = done.value
+            finally:
+                self.now = tick
+            self.searching = None
+            self.plans += 1
+
+            if self.search_root is not None and tick < self.plan_end:
+                self.next_plan = plan, plan_end, found
+                return
+
+            if self.search_tick < tick and ((plan and plan[0][0] < tick) or self.follow_plan(world, plan, plan_end) is None):
+                self.plan = []
+                self.plan_end = 0
+                late = tick >= self.search_must_finish
+                self.start_search(world, lead=0 if late else tick - self.search_tick + 1)
+                if late:
+                    continue  # No time left to wait
+                return
+            self.use_plan(world, plan, plan_end, found)
+            return
+
+    def act(self, world):
+        """Get the action for the world's current tick"""
+        start = time.perf_counter()
+        if world.lane_manager is not self.lane_manager or world.ticks < self.ticks:
+            self.reset(world.lane_manager)
+        self.ticks = world.ticks
+        tick = self.now = self.lane_manager.ticks
+        self.deadline = start + self.budget if self.budget is not None else None
+
+        # Drop cached windows of lanes that were culled
+        if len(self.windows) > 512:
+            self.windows = {key: value for key, value in self.windows.items() if key[0] in self.lane_manager.rows}
+
+        if self.searching is None or self.search_root is not None:
+            broken = self.plan and self.plan[0][0] < tick
+            if not broken and tick < self.plan_end:
+                # Something new spawned on the planned path: keep the plan if it still works
+                changed = any(self.get_motion(plan_row)[1] != signature
+                              for plan_row, signature in self.plan_rows_used.items())
+                if changed:
+                    broken = not self.check_plan(world)
+                    if not broken:
+                        self.remember_rows(world)
+            if broken:
+                # Plan again from here, also whatever was planned after it
+                self.plan = []
+                self.plan_end = 0
+                self.next_plan = None
+                self.start_search(world)
+            elif tick >= self.plan_end:
+                next_plan = self.next_plan
+                if next_plan is not None and next_plan[2] and self.follow_plan(world, *next_plan[:2]) is not None:
+                    self.use_plan(world, *next_plan)
+                elif self.searching is None:
+                    self.start_search(world)
+                # else the search for the next plan is still going, and now plans from here
+        if self.searching is None and self.next_plan is None and 0 < self.plan_end - tick and (
+                self.ahead_pending or (not self.plan_found and self.plan_end - tick <= RETRY_TICKS)):
+            self.search_ahead(world)  # See use_plan
+
+        if self.searching is not None:
+            self.continue_search(world)
+
+        action = ACTION_NONE
+        if tick < self.plan_end and self.plan and self.plan[0][0] == tick:
+            action = self.plan.pop(0)[1]
+        return action
+
+
+def run_games(seeds, max_ticks=FPS * 120, lane_manager_class=LaneManager):
+    """
+    Let the autopilot play one game per seed
+
+    Returns a list of (seed, score, ticks, death cause), the autopilot and the seconds each
+    act() call took.
+    """
+    autopilot = Autopilot()
+    results = []
+    tick_seconds = []
+    for seed in seeds:
+        world = World(lane_manager_class=lane_manager_class, seed=seed)
+        while not world.done and world.ticks < max_ticks:
+            start = time.perf_counter()
+            action = autopilot.act(world)
+            tick_seconds.append(time.perf_counter() - start)
+            world.apply_action(action)
+            world.step()
+        results.append((seed, world.player.score, world.ticks, world.death_cause))
+    return results, autopilot, tick_seconds
+
+
+def main(argv=None):
+    seeds = range(int(argv[0]) if argv else 10)
+    start = time.perf_counter()
+    results, autopilot, tick_seconds = run_games(seeds)
+    elapsed = time.perf_counter() - start
+    ticks = len(tick_seconds)
+    for seed, score, game_ticks, death_cause in results:
+        print(f'Seed {seed}: score {score} in {game_ticks / FPS:.1f}s, {death_cause or "still alive"}')
+    tick_seconds.sort()
+    print(f'{ticks} ticks in {elapsed:.2f}s, {autopilot.plans} plans')
+    print(f'Planning per tick (budget {autopilot.budget * 1000:g} ms): '
+          f'mean {sum(tick_seconds) / max(ticks, 1) * 1000:.3f} ms, '
+          f'p99 {percentile(tick_seconds, 0.99) * 1000:.3f} ms, max {percentile(tick_seconds, 1.0) * 1000:.3f} ms')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,183 @@
+import argparse
+import csv
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from simulation import ACTION_NONE, ACTION_UP, ACTION_LEFT, ACTION_RIGHT, FPS, LaneManager, World
+from autopilot import Autopilot
+
+# This file runs lots of headless episodes (one per seed) across a pool of worker processes.
+# Each worker builds its own World, plays an agent until it dies (or runs out of ticks) and sends
+# back only a small result row, never the world itself. Rows are written to a CSV or JSONL file
+# as soon as their chunk of seeds finishes.
+#
+#   python batch.py --seeds 0:10000 --agent forward --out results.csv
+#
+# An agent is a function (world, rng) -> ACTION_* called once per tick. Pick one of AGENTS by name
+# or give "module:function" to load your own (it is imported inside every worker).
+
+RESULT_FIELDS = ['seed', 'score', 'ticks', 'death_cause']
+
+
+def idle_agent(world, rng):
+    """Never moves (baseline: how long until the screen scrolls away or a log carries you off)"""
+    return ACTION_NONE
+
+
+def forward_agent(world, rng):
+    """Hops up as soon as the last hop has landed"""
+    return ACTION_NONE if world.player.is_hopping else ACTION_UP
+
+
+def random_agent(world, rng):
+    """Hops in a random direction every now and then, mostly forward"""
+    if world.player.is_hopping or rng.random() < 0.8:
+        return ACTION_NONE
+    return rng.choice((ACTION_UP, ACTION_UP, ACTION_UP, ACTION_LEFT, ACTION_RIGHT))
+
+
+AGENTS = {
+    'idle': idle_agent,
+    'forward': forward_agent,
+    'random': random_agent,
+    # Plans hops with autopilot.py (notices each new world by itself). Without a time budget, so its
+    # results only depend on the seed and not on how fast the machine is
+    'autopilot': Autopilot(budget=None),
+}
+
+
+def load_agent(name):
+    """Look up an agent by name in AGENTS, or import it from "module:function" """
+    if name in AGENTS:
+        return AGENTS[name]
+    module_name, _, function_name = name.partition(':')
+    if not function_name:
+        raise ValueError(f'Unknown agent {name!r} (pick one of {", ".join(AGENTS)} or use module:function)')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def run_episode(seed, agent, max_ticks=None, lane_manager_class=LaneManager, world=None):
+    """Play one headless episode (in world, reset to the seed, if given), returns its result row"""
+    if world is None:
+        world = World(lane_manager_class=lane_manager_class, seed=seed)
+    else:
+        world.reset(seed)
+    rng = random.Random(seed)  # The agent's own randomness, separate from the world's
+    while not world.done and (max_ticks is None or world.ticks < max_ticks):
+        world.apply_action(agent(world, rng))
+        world.step()
+    return {
+        'seed': seed,
+        'score': world.player.score,
+        'ticks': world.ticks,
+        'death_cause': world.death_cause,
+    }
+
+
+def run_chunk(seeds, agent_name, max_ticks=None):
+    """Worker entry point: play one episode per seed, returns the list of result rows"""
+    agent = load_agent(agent_name)
+    # One world for the whole chunk: resetting it recycles the last episode's lanes, cars and logs
+    world = World(lane_manager_class=LaneManager)
+    return [run_episode(seed, agent, max_ticks, LaneManager, world) for seed in seeds]
+
+
+def chunked(seeds, size):
+    """Split a list of seeds into lists of at most size seeds"""
+    return [seeds[i:i + size] for i in range(0, len(seeds), size)]
+
+
+def run_batch(seeds, agent_name, workers=None, chunk_size=None, max_ticks=None):
+    """Run every seed across a process pool, yields result rows as chunks finish (unordered)"""
+    workers = workers or os.cpu_count() or 1
+    # A few chunks per worker keeps them all busy even when some episodes run much longer
+    chunk_size = chunk_size or max(1, min(100, len(seeds) // (workers * 4)))
+
+    if workers == 1:
+        for chunk in chunked(seeds, chunk_size):
+            yield from run_chunk(chunk, agent_name, max_ticks)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_chunk, chunk, agent_name, max_ticks)
+                   for chunk in chunked(seeds, chunk_size)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+class ResultWriter:
+    """Streams result rows to a CSV or JSONL file (picked by extension)"""
+
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.jsonl = path.endswith('.jsonl')
+        if not self.jsonl:
+            self.csv = csv.DictWriter(self.file, fieldnames=RESULT_FIELDS)
+            self.csv.writeheader()
+
+    def write(self, row):
+        if self.jsonl:
+            self.file.write(json.dumps(row) + '\n')
+        else:
+            self.csv.writerow(row)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_seeds(text):
+    """Parse "START:STOP" (stop excluded) or a comma separated list of seeds"""
+    if ':' in text:
+        start, stop = text.split(':')
+        return list(range(int(start), int(stop)))
+    return [int(seed) for seed in text.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run many headless Crossy Road episodes in parallel')
+    parser.add_argument('--seeds', default='0:1000', help='START:STOP range or comma separated list (default 0:1000)')
+    parser.add_argument('--agent', default='forward', help=f'{", ".join(AGENTS)} or module:function (default forward)')
+    parser.add_argument('--out', default='results.csv', help='output file, .csv or .jsonl (default results.csv)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--chunk-size', type=int, default=None, help='seeds per task sent to a worker')
+    parser.add_argument('--max-seconds', type=float, default=None, help='cut episodes off after this much game time')
+    args = parser.parse_args(argv)
+
+    seeds = parse_seeds(args.seeds)
+    load_agent(args.agent)  # Fail early on a bad agent name
+    max_ticks = round(args.max_seconds * FPS) if args.max_seconds else None
+
+    writer = ResultWriter(args.out)
+    start = time.perf_counter()
+    done = 0
+    total_ticks = 0
+    total_score = 0
+    try:
+        for row in run_batch(seeds, args.agent, args.workers, args.chunk_size, max_ticks):
+            writer.write(row)
+            done += 1
+            total_ticks += row['ticks']
+            total_score += row['score']
+            writer.flush()
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+
+    print(f'{done} episodes, {total_ticks} ticks in {elapsed:.2f}s '
+          f'({done / max(elapsed, 1e-9):.0f} episodes/s, {total_ticks / max(elapsed, 1e-9):.0f} ticks/s)')
+    if done:
+        print(f'Average score {total_score / done:.2f}, average survival {total_ticks / done / FPS:.1f}s')
+    print(f'Results written to {args.out}')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from simulation import (SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE, FPS, LANE_ROAD, LANE_RIVER,
+                        LaneManager, EveryLaneManager, World)
+
+# This file is the benchmark suite. With fixed seeds it times:
+#   - headless ticks per second of LaneManager.update + check_collision + handle_river_logic, for a
+#     few active-window margins (rows above the screen updated every tick), without the active
+#     window at all, and for a few traffic densities
+#   - milliseconds per frame of LaneManager.draw, Player.draw, draw_menu and draw_game_over,
+#     drawn off screen (needs pygame)
+#   - cold start: milliseconds to start Python and import main.py in a fresh process
+# It also counts the cars, logs and lanes the ObjectPool creates and reuses once a game has warmed
+# up (created should hardly grow by then), and saves those counts in the JSON under "pool".
+# Results are written as JSON, and two result files can be compared to flag regressions:
+#
+#   python bench.py --out before.json
+#   python bench.py --out after.json
+#   python bench.py --compare before.json after.json
+#
+# Timings are only comparable between runs on the same machine.
+
+BENCH_SEEDS = (0, 1, 2)
+# Active-window margins: rows above the screen updated every tick. Lanes are only kept up to a
+# screen height above the screen, so SCREEN_HEIGHT // TILE_SIZE covers all of those, but lanes
+# below the screen are still left out at any margin. None updates every lane (EveryLaneManager)
+BENCH_MARGINS = (0, 6, SCREEN_HEIGHT // TILE_SIZE, None)
+BENCH_DENSITIES = (0.5, 1.0, 2.0)  # Traffic densities: spawn chance multipliers
+HOP_TICKS = 12  # The probe chicken hops up this often, so the camera keeps generating and culling lanes
+POOL_WARMUP_TICKS = FPS * 10  # Ticks before the pool counts start
+STARTUP_RUNS = 5
+
+RESULTS_VERSION = 1
+DEFAULT_THRESHOLD = 0.10  # Relative change counted as a regression by --compare
+
+
+def dense_lane_class(lane_class, density):
+    """Get a subclass of lane_class whose roads and rivers spawn density times as often"""
+    if density == 1:
+        return lane_class
+
+    class DenseLane(lane_class):
+        __slots__ = ()
+
+        def reset(self, *args):
+            super().reset(*args)
+            if self.type == LANE_ROAD or self.type == LANE_RIVER:
+                self.spawn_chance = min(0.5, self.spawn_chance * density)
+
+    return DenseLane
+
+
+def bench_manager_class(margin, density):
+    """Get a LaneManager subclass with the given active-window margin (rows, None = every lane) and traffic density"""
+    base = EveryLaneManager if margin is None else LaneManager
+    attributes = {'lane_class': dense_lane_class(base.lane_class, density)}
+    if margin is not None:
+        attributes['active_margin'] = margin * TILE_SIZE
+    return type('BenchLaneManager', (base,), attributes)
+
+
+def run_probe(world, ticks):
+    """Run lane updates and the collision and river checks for ticks, with a probe chicken hopping up"""
+    lane_manager = world.lane_manager
+    player = world.player
+    # The probe never dies: it is put back in place every tick whatever the checks say
+    x = player.x
+    y = player.y
+    for tick in range(ticks):
+        if tick % HOP_TICKS == 0:
+            y -= TILE_SIZE
+        player.x = player.rect.x = x
+        player.y = player.rect.y = y
+        lane_manager.update_camera(y)
+        lane_manager.update()
+        lane_manager.check_collision(player.rect)
+        lane_manager.handle_river_logic(player)
+
+
+def bench_ticks(margin, density, ticks, seeds=BENCH_SEEDS):
+    """Time lane updates and the collision and river checks, returns ticks per second"""
+    manager_class = bench_manager_class(margin, density)
+    elapsed = 0.0
+    for seed in seeds:
+        world = World(lane_manager_class=manager_class, seed=seed)
+        start = time.perf_counter()
+        run_probe(world, ticks)
+        elapsed += time.perf_counter() - start
+    return ticks * len(seeds) / elapsed
+
+
+def count_pool(ticks, warmup=POOL_WARMUP_TICKS, seeds=BENCH_SEEDS):
+    """
+    Count what the ObjectPool creates and reuses in ticks after warmup ticks of the probe
+
+    Returns {class name: {'created': count, 'reused': count}}, summed over the seeds.
+    """
+    counts = {}
+    for seed in seeds:
+        world = World(seed=seed)
+        run_probe(world, warmup)
+        before = world.lane_manager.pool.stats()
+        run_probe(world, ticks)
+        for name, (created, reused, _) in world.lane_manager.pool.stats().items():
+            created_before, reused_before, _ = before.get(name, (0, 0, 0))
+            total = counts.setdefault(name, {'created': 0, 'reused': 0})
+            total['created'] += created - created_before
+            total['reused'] += reused - reused_before
+    return counts
+
+
+def bench_render(frames, seeds=BENCH_SEEDS):
+    """Time the drawing functions off screen, returns {name: milliseconds per frame}"""
+    # Imported here so the headless benchmarks work without pygame
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    import main
+
+    pygame.init()
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    totals = {'lane_manager_draw': 0.0, 'player_draw': 0.0, 'draw_menu': 0.0, 'draw_game_over': 0.0}
+    count = 0
+    for seed in seeds:
+        world = World(lane_manager_class=main.LaneManager, player_class=main.Player, seed=seed)
+        menu_cars = [main.Car(SCREEN_WIDTH * i // 6, 155 + (i // 2) * 120, 2 + i % 3, 1 if i % 2 == 0 else -1)
+                     for i in range(6)]
+        background = main.LaneBackground()  # Own cache, like a fresh game window
+        for frame in range(frames):
+            # Keep hopping forward (not timed), so the view scrolls and lanes come and go
+            if frame % HOP_TICKS == 0:
+                world.move(0, -1)
+            if world.step():
+                world.reset(seed + frame)
+            main.update_menu_cars(menu_cars)
+            lane_manager = world.lane_manager
+            alpha = 0.5
+
+            start = time.perf_counter()
+            lane_manager.draw(surface, [], alpha, background)
+            middle = time.perf_counter()
+            world.player.draw(surface, lane_manager.get_render_camera_y(alpha), alpha)
+            end = time.perf_counter()
+            totals['lane_manager_draw'] += middle - start
+            totals['player_draw'] += end - middle
+
+            start = time.perf_counter()
+            main.draw_menu(surface, menu_cars, alpha)
+            middle = time.perf_counter()
+            main.draw_game_over(surface, world.player.score)
+            end = time.perf_counter()
+            totals['draw_menu'] += middle - start
+            totals['draw_game_over'] += end - middle
+            count += 1
+    pygame.quit()
+    return {name: total / count * 1000 for name, total in totals.items()}
+
+
+def time_process(code, runs=STARTUP_RUNS):
+    """Run code in fresh Python processes, returns the median wall time in milliseconds"""
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=here, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def run_benchmarks(quick=False, render=True, startup=True, log=print):
+    """Run the suite, returns ({benchmark name: {'value', 'unit', 'better'}}, pool counts (see count_pool))"""
+    ticks = 500 if quick else FPS * 50
+    frames = 60 if quick else 300
+    results = {}
+
+    def record(name, value, unit, better):
+        results[name] = {'value': value, 'unit': unit, 'better': better}
+        log(f'{name}: {value:.3f} {unit}')
+
+    for margin in BENCH_MARGINS:
+        for density in BENCH_DENSITIES:
+            window = 'every_lane' if margin is None else f'margin{margin}'
+            record(f'ticks_{window}_density{density:g}', bench_ticks(margin, density, ticks),
+                   'ticks/s', 'higher')
+
+    pool = count_pool(ticks)
+    for name, counts in pool.items():
+        log(f'pool {name}: {counts["created"]} created, {counts["reused"]} reused after warm-up')
+
+    if render:
+        try:
+            costs = bench_render(frames)
+        except ImportError as error:
+            log(f'Skipping render benchmarks: {error}')
+        else:
+            for name, value in costs.items():
+                record(f'render_{name}', value, 'ms/frame', 'lower')
+
+    if startup:
+        python = time_process('pass')
+        record('startup_python', python, 'ms', 'lower')
+        record('startup_import_main', time_process('import main'), 'ms', 'lower')
+    return results, pool
+
+
+def save_results(path, results, quick=False, pool=None):
+    """Write results, the pool counts and a little about the machine to a JSON file"""
+    data = {
+        'version': RESULTS_VERSION,
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'seeds': list(BENCH_SEEDS),
+            'quick': quick,
+        },
+        'results': results,
+        'pool': pool or {},
+    }
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=2)
+
+
+def load_results(path):
+    with open(path) as file:
+        data = json.load(file)
+    if data.get('version') != RESULTS_VERSION:
+        raise ValueError(f'{path}: unsupported benchmark results version {data.get("version")}')
+    return data['results']
+
+
+def compare_results(old, new, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two sets of results, returns a list of (name, old value, new value, change, regressed)
+
+    change is the relative improvement (positive = better, whichever way the unit goes), and a
+    benchmark regressed if it got worse by more than threshold.
+    """
+    rows = []
+    for name in old:
+        if name not in new:
+            continue
+        before = old[name]['value']
+        after = new[name]['value']
+        change = (after - before) / before if before else 0.0
+        if old[name]['better'] == 'lower':
+            change = -change
+        rows.append((name, before, after, change, change < -threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Crossy Road ticks, drawing and startup')
+    parser.add_argument('--out', default='bench.json', help='where to write the results (default bench.json)')
+    parser.add_argument('--quick', action='store_true', help='shorter runs (noisier, for a quick check)')
+    parser.add_argument('--no-render', action='store_true', help='skip the drawing benchmarks')
+    parser.add_argument('--no-startup', action='store_true', help='skip the startup benchmarks')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two result files instead of running, exits with 1 on regressions')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'relative slowdown counted as a regression (default {DEFAULT_THRESHOLD})')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        rows = compare_results(load_results(args.compare[0]), load_results(args.compare[1]), args.threshold)
+        regressions = 0
+        for name, before, after, change, regressed in rows:
+            print(f'{name:40} {before:12.3f} -> {after:12.3f}  {change:+7.1%}{"  REGRESSION" if regressed else ""}')
+            regressions += regressed
+        print(f'{regressions} regression{"" if regressions == 1 else "s"} (threshold {args.threshold:.0%})')
+        return 1 if regressions else 0
+
+    results, pool = run_benchmarks(args.quick, not args.no_render, not args.no_startup)
+    save_results(args.out, results, args.quick, pool)
+    print(f'Results written to {args.out}')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import random
+
+import numpy as np
+
+from simulation import (SCREEN_WIDTH, LANE_ROAD, LANE_RIVER,
+                        ACTION_MOVES, LaneManager, Player, World)
+from observation import GRID_SHAPE, GridObserver
+
+# This file wraps the headless simulation in a reinforcement learning style environment:
+# reset(seed) -> observation, step(action) -> (observation, reward, done, info).
+# One step is one simulation tick with an optional hop (one of the ACTION_* constants).
+# The reward is the score gained on that step, and an episode ends when the chicken drowns,
+# is hit by a car or falls off the bottom of the screen.
+# VectorEnv steps many independent worlds with one call and resets finished ones automatically.
+# Observations are a small feature vector by default, the occupancy grid from observation.py
+# with observation='grid', or rendered RGB images from pixels.py with observation='pixels'.
+
+ACTION_COUNT = len(ACTION_MOVES)
+
+# Rows described in the observation, relative to the player's row (negative = ahead)
+ROWS_AHEAD = 7
+ROWS_BEHIND = 2
+
+# Per-row features: is road, is river, obstacle velocity, player's column blocked right now
+ROW_FEATURES = 4
+
+
+class CrossyRoadEnv:
+    """
+    Single Crossy Road world with a reset/step interface
+
+    The default 'vector' observation is a float32 vector: the player's x (0-1 across the screen), then
+    ROW_FEATURES values for each row from ROWS_AHEAD rows ahead to ROWS_BEHIND rows behind.
+    "Blocked" means a car overlaps the player's column on a road, or no log does on a river.
+    The 'grid' observation is the GRID_SHAPE occupancy grid (see observation.py).
+    The 'pixels' observation is a (height, width, 3) uint8 image of the screen (see pixels.py);
+    without out, observe() returns the renderer's reused pixel view instead of a new array.
+    """
+
+    observation_size = 1 + (ROWS_AHEAD + 1 + ROWS_BEHIND) * ROW_FEATURES
+
+    def __init__(self, lane_manager_class=LaneManager, max_ticks=None, observation='vector',
+                 pixel_size=(84, 84)):
+        self.lane_manager_class = lane_manager_class
+        self.player_class = Player
+        self.max_ticks = max_ticks  # Episodes are cut off (done, no death cause) after this many ticks
+        self.world = None
+        self.grid = None
+        self.pixels = None
+        self.observation_dtype = np.float32
+        if observation == 'vector':
+            self.observation_shape = (self.observation_size,)
+        elif observation == 'grid':
+            self.observation_shape = GRID_SHAPE
+            self.grid = GridObserver()
+        elif observation == 'pixels':
+            # Imported here so the other observations work without pygame
+            from pixels import PixelRenderer
+            if lane_manager_class is not LaneManager:
+                raise ValueError('Pixel observations need the object lane engine')
+            self.pixels = PixelRenderer(*pixel_size)
+            self.lane_manager_class = self.pixels.lane_manager_class
+            self.player_class = self.pixels.player_class
+            self.observation_shape = (pixel_size[1], pixel_size[0], 3)
+            self.observation_dtype = np.uint8
+        else:
+            raise ValueError(f"Unknown observation {observation!r} (use 'vector', 'grid' or 'pixels')")
+
+    def reset(self, seed=None):
+        """Start a new episode (random world if seed is None), returns the first observation"""
+        if self.world is None:
+            self.world = World(lane_manager_class=self.lane_manager_class, player_class=self.player_class, seed=seed)
+        else:
+            self.world.reset(seed)
+        return self.observe()
+
+    def step(self, action):
+        """Apply an action for one tick, returns (observation, reward, done, info)"""
+        world = self.world
+        score = world.player.score
+        world.apply_action(action)
+        world.step()
+        reward = world.player.score - score
+        done = world.done or (self.max_ticks is not None and world.ticks >= self.max_ticks)
+        return self.observe(), reward, done, self.info()
+
+    def info(self):
+        """Details about the current episode"""
+        world = self.world
+        return {
+            'seed': world.seed,
+            'score': world.player.score,
+            'ticks': world.ticks,
+            'death_cause': world.death_cause,
+        }
+
+    def observe(self, out=None):
+        """Build the observation (into out, if given, to avoid allocating)"""
+        if self.grid is not None:
+            return self.grid.observe(self.world, out)
+        if self.pixels is not None:
+            frame = self.pixels.render(self.world)
+            if out is None:
+                return frame
+            out[...] = frame
+            return out
+        if out is None:
+            out = np.zeros(self.observation_size, dtype=np.float32)
+        else:
+            out.fill(0)
+
+        player = self.world.player
+        lane_manager = self.world.lane_manager
+        out[0] = player.x / SCREEN_WIDTH
+
+        player_row = lane_manager.row_of(player.y)
+        left = player.x
+        right = player.x + player.size
+        i = 1
+        for row in range(player_row - ROWS_AHEAD, player_row + ROWS_BEHIND + 1):
+            lane = lane_manager.rows.get(row)
+            if lane is not None and lane.type == LANE_ROAD:
+                out[i] = 1
+                out[i + 2] = lane.car_speed * lane.car_direction / 5
+                out[i + 3] = any(x < right and left < x + width
+                                 for x, width in lane_manager.get_obstacle_spans(row))
+            elif lane is not None and lane.type == LANE_RIVER:
+                out[i + 1] = 1
+                out[i + 2] = lane.log_speed * lane.log_direction / 5
+                out[i + 3] = not any(x < right and left < x + width
+                                     for x, width in lane_manager.get_obstacle_spans(row))
+            i += ROW_FEATURES
+        return out
+
+
+class VectorEnv:
+    """
+    Steps num_envs independent worlds at once
+
+    Observations, rewards and done flags are written into preallocated arrays (returned
+    by reset/step, reused on every call). Finished worlds are reset straight away; the info
+    of the finished episode is returned for that step with 'final_observation' added.
+    """
+
+    def __init__(self, num_envs, lane_manager_class=LaneManager, max_ticks=None, observation='vector',
+                 pixel_size=(84, 84)):
+        self.envs = [CrossyRoadEnv(lane_manager_class, max_ticks, observation, pixel_size) for _ in range(num_envs)]
+        env = self.envs[0]
+        self.observations = np.zeros((num_envs,) + env.observation_shape, dtype=env.observation_dtype)
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.dones = np.zeros(num_envs, dtype=bool)
+        self.seeds = random.Random()  # Seeds for automatic resets
+
+    @property
+    def num_envs(self):
+        return len(self.envs)
+
+    def reset(self, seed=None):
+        """Reset every world (world i gets seed + i, later resets follow from seed), returns observations"""
+        self.seeds = random.Random(seed)
+        for i, env in enumerate(self.envs):
+            env.reset(seed + i if seed is not None else None)
+            env.observe(self.observations[i])
+        return self.observations
+
+    def step(self, actions):
+        """Apply one action per world for one tick, returns (observations, rewards, dones, infos)"""
+        infos = []
+        for i, env in enumerate(self.envs):
+            world = env.world
+            score = world.player.score
+            world.apply_action(int(actions[i]))
+            world.step()
+            self.rewards[i] = world.player.score - score
+            done = world.done or (env.max_ticks is not None and world.ticks >= env.max_ticks)
+            self.dones[i] = done
+            info = env.info()
+            if done:
+                info['final_observation'] = np.array(env.observe())  # A copy, the env is reset next
+                env.reset(self.seeds.randrange(2 ** 32))
+            env.observe(self.observations[i])
+            infos.append(info)
+        return self.observations, self.rewards, self.dones, infos
@@ -1,16 +1,19 @@
 import pygame
 import sys
+import os
+import argparse
+from collections import OrderedDict
 import random
 import math
 
-# Initialize Pygame
-pygame.init()
-
-# Constants
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 600
-TILE_SIZE = 40
-FPS = 60
+import simulation
+from simulation import (SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE, FPS, TICK_SECONDS,
+                        LANE_GRASS, LANE_ROAD, LANE_RIVER,
+                        ACTION_NONE, ACTION_UP, ACTION_DOWN, ACTION_LEFT, ACTION_RIGHT, World, lerp)
+from replay import SEED_MIN, SEED_MAX, Replay, ReplayPlayback
+from autopilot import Autopilot
+from profiler import (FrameProfiler, TracingProfiler, PHASE_NAMES, PHASE_EVENTS, PHASE_INPUT, PHASE_PREGENERATE,
+                      PHASE_DRAW_LANES, PHASE_DRAW_PLAYER, PHASE_DRAW_UI, PHASE_OVERLAY, PHASE_FLIP, PHASE_WAIT)
 
 # Colors
 WHITE = (255, 255, 255)
@@ -26,19 +29,48 @@ BLUE = (30, 144, 255)
 BROWN = (139, 69, 19)
 DARK_BROWN = (90, 45, 12)
 
+# Lane background colors by type
+LANE_COLORS = {
+    LANE_GRASS: GREEN,
+    LANE_ROAD: DARK_GRAY,
+    LANE_RIVER: BLUE,
+}
+
 # Game States
 STATE_MENU = 'MENU'
 STATE_PLAYING = 'PLAYING'
 STATE_GAMEOVER = 'GAMEOVER'
 
-# Screen setup
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Crossy Road")
-clock = pygame.time.Clock()
+# Longest stretch of real time simulated in one frame (longer hitches slow the game down instead)
+MAX_FRAME_SECONDS = 0.25
+
+# Font sizes
+FONT_SIZE = 36
+LARGE_FONT_SIZE = 72
+TITLE_FONT_SIZE = 92
+CONTROLS_FONT_SIZE = 28
+OVERLAY_FONT_SIZE = 20
+
+# The profiler overlay is only rendered again every this many frames (the numbers would be unreadable anyway)
+OVERLAY_REFRESH_FRAMES = 15
+
+# Screen and clock are created by init_display() so importing this module never opens a window
+screen = None
+clock = None
+
+
+def init_display():
+    """Initialize pygame and open the game window"""
+    global screen, clock
+
+    pygame.init()
 
-# Font setup
-font = pygame.font.Font(None, 36)
-large_font = pygame.font.Font(None, 72)
+    # Screen setup
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Crossy Road")
+    clock = pygame.time.Clock()
+
+    return screen
 
 
 def draw_voxel_rect(surface, x, y, width, height, top_color, side_color, depth=8):
@@ -80,45 +112,68 @@ def draw_voxel_rect(surface, x, y, width, height, top_color, side_color, depth=8
     ])
 
 
-class Car:
-    def __init__(self, x, y, speed, direction):
-        self.x = x
-        self.y = y
-        self.width = TILE_SIZE * 2  # Cars are 2 tiles wide
-        self.height = TILE_SIZE - 4  # Slightly smaller than lane height
-        self.speed = speed
-        self.direction = direction  # 1 for right, -1 for left
-        self.color = RED
-        self.dark_color = DARK_RED
-        self.rect = pygame.Rect(self.x, self.y, self.width, self.height)
-    
-    def update(self):
-        """Move the car horizontally"""
-        self.x += self.speed * self.direction
-        self.rect.x = self.x
-        
-        # Check if car is off screen
-        if self.direction > 0:  # Moving right
-            return self.x > SCREEN_WIDTH
-        else:  # Moving left
-            return self.x + self.width < 0
-    
-    def move_down(self, dy):
-        """Move car down (for camera scrolling)"""
-        self.y += dy
-        self.rect.y = self.y
-    
-    def draw(self, surface):
-        """Draw the car with voxel effect, windows, and headlights"""
+class SpriteCache:
+    """Pre-rendered voxel sprites, one alpha Surface per distinct look, so drawing is a single blit"""
+    
+    def __init__(self):
+        self.sprites = {}
+    
+    def get(self, key, size, origin, render):
+        """
+        Get the sprite for key, rendering it once on first use
+        
+        Args:
+            key: Hashable description of the look (entity type, direction, facing, hop depth...)
+            size: (width, height) of the sprite surface
+            origin: Position inside the sprite that render() treats as the entity's position
+            render: Function render(surface, x, y) that draws the entity at (x, y)
+        """
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = pygame.Surface(size, pygame.SRCALPHA)
+            render(sprite, *origin)
+            # Match the display's pixel format for faster blits (only possible once a window exists)
+            if pygame.display.get_surface() is not None:
+                sprite = sprite.convert_alpha()
+            self.sprites[key] = sprite
+        return sprite
+
+
+# Shared by every car, log and chicken (2 car looks, 2 log looks, 4 facings x a few hop depths)
+sprite_cache = SpriteCache()
+
+# Padding around obstacle sprites so thick lines and edge polygons are not clipped
+SPRITE_PAD = 2
+
+
+class Car(simulation.Car):
+    __slots__ = ()
+    
+    color = RED
+    dark_color = DARK_RED
+    
+    def draw(self, surface, x=None, y=None):
+        """Draw the car by blitting its cached sprite at (x, y) (default: its own position), returns the screen area drawn"""
+        if x is None:
+            x = self.x
+        if y is None:
+            y = self.y
+        sprite = sprite_cache.get(('car', self.direction),
+                                  (self.width + SPRITE_PAD * 2 + 1, self.height + 8 + SPRITE_PAD * 2 + 1),
+                                  (SPRITE_PAD, 8 + SPRITE_PAD), self.render)
+        return surface.blit(sprite, (int(x) - SPRITE_PAD, int(y) - 8 - SPRITE_PAD))
+    
+    def render(self, surface, x, y):
+        """Draw the car at (x, y) with voxel effect, windows, and headlights"""
         # Draw main car body with voxel effect
-        draw_voxel_rect(surface, self.x, self.y, self.width, self.height, 
+        draw_voxel_rect(surface, x, y, self.width, self.height, 
                        self.color, self.dark_color, depth=8)
         
         # Draw windows (darker rectangle on top of car body)
         window_width = self.width * 0.5
         window_height = self.height * 0.5
-        window_x = self.x + (self.width - window_width) / 2
-        window_y = self.y - 8 + (self.height - window_height) / 2  # -8 accounts for voxel depth
+        window_x = x + (self.width - window_width) / 2
+        window_y = y - 8 + (self.height - window_height) / 2  # -8 accounts for voxel depth
         
         # Very dark color for windows
         window_color = (30, 30, 30)
@@ -127,17 +182,17 @@ class Car:
         
         # Draw headlights (two tiny yellow circles at the front)
         headlight_radius = 3
-        headlight_y = self.y - 8 + self.height / 2  # Center vertically on the top of the voxel
+        headlight_y = y - 8 + self.height / 2  # Center vertically on the top of the voxel
         
         if self.direction > 0:  # Moving right, headlights on the right side
-            headlight_x = self.x + self.width - headlight_radius * 2
+            headlight_x = x + self.width - headlight_radius * 2
             # Two headlights stacked vertically
             pygame.draw.circle(surface, YELLOW, 
                              (int(headlight_x), int(headlight_y - 5)), headlight_radius)
             pygame.draw.circle(surface, YELLOW, 
                              (int(headlight_x), int(headlight_y + 5)), headlight_radius)
         else:  # Moving left, headlights on the left side
-            headlight_x = self.x + headlight_radius * 2
+            headlight_x = x + headlight_radius * 2
             # Two headlights stacked vertically
             pygame.draw.circle(surface, YELLOW, 
                              (int(headlight_x), int(headlight_y - 5)), headlight_radius)
@@ -145,43 +200,32 @@ class Car:
                              (int(headlight_x), int(headlight_y + 5)), headlight_radius)
 
 
-class Log:
-    def __init__(self, x, y, speed, direction):
-        self.x = x
-        self.y = y
-        self.width = TILE_SIZE * 3  # Logs are 3 tiles wide (larger than cars)
-        self.height = TILE_SIZE - 4  # Slightly smaller than lane height
-        self.speed = speed
-        self.direction = direction  # 1 for right, -1 for left
-        self.color = BROWN
-        self.dark_color = DARK_BROWN
-        self.rect = pygame.Rect(self.x, self.y, self.width, self.height)
-    
-    def update(self):
-        """Move the log horizontally"""
-        self.x += self.speed * self.direction
-        self.rect.x = self.x
-        
-        # Check if log is off screen
-        if self.direction > 0:  # Moving right
-            return self.x > SCREEN_WIDTH
-        else:  # Moving left
-            return self.x + self.width < 0
-    
-    def move_down(self, dy):
-        """Move log down (for camera scrolling)"""
-        self.y += dy
-        self.rect.y = self.y
-    
-    def draw(self, surface):
-        """Draw the log with voxel effect and wood grain"""
+class Log(simulation.Log):
+    __slots__ = ()
+    
+    color = BROWN
+    dark_color = DARK_BROWN
+    
+    def draw(self, surface, x=None, y=None):
+        """Draw the log by blitting its cached sprite at (x, y) (default: its own position), returns the screen area drawn"""
+        if x is None:
+            x = self.x
+        if y is None:
+            y = self.y
+        sprite = sprite_cache.get(('log', self.direction),
+                                  (self.width + SPRITE_PAD * 2 + 1, self.height + 8 + SPRITE_PAD * 2 + 1),
+                                  (SPRITE_PAD, 8 + SPRITE_PAD), self.render)
+        return surface.blit(sprite, (int(x) - SPRITE_PAD, int(y) - 8 - SPRITE_PAD))
+    
+    def render(self, surface, x, y):
+        """Draw the log at (x, y) with voxel effect and wood grain"""
         # Draw main log body with voxel effect
-        draw_voxel_rect(surface, self.x, self.y, self.width, self.height, 
+        draw_voxel_rect(surface, x, y, self.width, self.height, 
                        self.color, self.dark_color, depth=8)
         
         # Draw wood grain (three thin dark-brown horizontal lines)
         grain_color = (60, 30, 10)  # Very dark brown for wood grain
-        grain_y_top = self.y - 8  # Top surface of the voxel
+        grain_y_top = y - 8  # Top surface of the voxel
         
         # Three horizontal lines at different positions
         grain_positions = [0.25, 0.5, 0.75]  # Percentages across the height
@@ -190,481 +234,304 @@ class Log:
             grain_y = grain_y_top + self.height * pos
             # Draw thin line across the length of the log
             pygame.draw.line(surface, grain_color, 
-                           (int(self.x), int(grain_y)), 
-                           (int(self.x + self.width), int(grain_y)), 
+                           (int(x), int(grain_y)), 
+                           (int(x + self.width), int(grain_y)), 
                            2)  # Line thickness of 2 pixels
 
 
-class Lane:
-    def __init__(self, y, lane_type):
-        self.rect = pygame.Rect(0, y, SCREEN_WIDTH, TILE_SIZE)
-        self.type = lane_type  # 'GRASS', 'ROAD', or 'RIVER'
-        self.cars = []
-        self.logs = []
-        
-        # Set color based on type
-        if self.type == 'GRASS':
-            self.color = GREEN
-        elif self.type == 'ROAD':
-            self.color = DARK_GRAY
-            # Road lanes have cars with random speed and direction
-            self.car_speed = random.randint(2, 5)
-            self.car_direction = random.choice([-1, 1])  # -1 left, 1 right
-            # Random spawn chance per frame (lower = more frequent)
-            self.spawn_chance = random.uniform(0.01, 0.03)  # 1-3% chance per frame
-            self.min_car_spacing = random.randint(200, 400)  # Much larger spacing: 200-400 pixels (5-10 tiles)
-        else:  # RIVER
-            self.color = BLUE
-            # River lanes have logs with slower speeds
-            self.log_speed = random.randint(1, 3)  # Slower than cars
-            self.log_direction = random.choice([-1, 1])  # -1 left, 1 right
-            # Random spawn chance per frame
-            self.spawn_chance = random.uniform(0.01, 0.025)  # 1-2.5% chance per frame
-            self.min_log_spacing = random.randint(150, 300)  # Spacing between logs
-    
-    def spawn_car(self):
-        """Spawn a new car at the edge of the screen"""
-        if self.car_direction > 0:  # Moving right, spawn on left
-            x = -TILE_SIZE * 2
-        else:  # Moving left, spawn on right
-            x = SCREEN_WIDTH
-        
-        car = Car(x, self.rect.y + 2, self.car_speed, self.car_direction)
-        self.cars.append(car)
-    
-    def spawn_log(self):
-        """Spawn a new log at the edge of the screen"""
-        if self.log_direction > 0:  # Moving right, spawn on left
-            x = -TILE_SIZE * 3
-        else:  # Moving left, spawn on right
-            x = SCREEN_WIDTH
-        
-        log = Log(x, self.rect.y + 2, self.log_speed, self.log_direction)
-        self.logs.append(log)
-    
-    def can_spawn_car(self):
-        """Check if there's enough space to spawn a new car"""
-        if not self.cars:
-            return True
-        
-        # Check the most recently spawned car
-        last_car = self.cars[-1]
-        
-        # Calculate distance from spawn point to the last car
-        # We want to ensure the last car has moved far enough into the screen
-        if self.car_direction > 0:  # Moving right, cars spawn from left
-            # Last car needs to be well into the screen before spawning next
-            distance = last_car.x
-        else:  # Moving left, cars spawn from right
-            # Last car needs to have moved well away from right edge
-            distance = SCREEN_WIDTH - (last_car.x + last_car.width)
-        
-        # Require much larger spacing - at least 200-400 pixels (5-10 tiles)
-        return distance >= self.min_car_spacing
-    
-    def can_spawn_log(self):
-        """Check if there's enough space to spawn a new log"""
-        if not self.logs:
-            return True
-        
-        # Check the most recently spawned log
-        last_log = self.logs[-1]
-        
-        # Calculate distance from spawn point to the last log
-        if self.log_direction > 0:  # Moving right, logs spawn from left
-            distance = last_log.x
-        else:  # Moving left, logs spawn from right
-            distance = SCREEN_WIDTH - (last_log.x + last_log.width)
-        
-        return distance >= self.min_log_spacing
-    
-    def update(self):
-        """Update cars/logs in this lane"""
-        if self.type == 'ROAD':
-            # Random chance to spawn a car each frame
-            if random.random() < self.spawn_chance and self.can_spawn_car():
-                self.spawn_car()
-            
-            # Update all cars and remove those off screen
-            cars_to_remove = []
-            for car in self.cars:
-                if car.update():  # Returns True if off screen
-                    cars_to_remove.append(car)
-            
-            for car in cars_to_remove:
-                self.cars.remove(car)
-        
-        elif self.type == 'RIVER':
-            # Random chance to spawn a log each frame
-            if random.random() < self.spawn_chance and self.can_spawn_log():
-                self.spawn_log()
-            
-            # Update all logs and remove those off screen
-            logs_to_remove = []
-            for log in self.logs:
-                if log.update():  # Returns True if off screen
-                    logs_to_remove.append(log)
-            
-            for log in logs_to_remove:
-                self.logs.remove(log)
-    
-    def move_down(self, dy):
-        """Move lane down by dy pixels"""
-        self.rect.y += dy
-        # Also move all cars and logs in this lane
-        for car in self.cars:
-            car.move_down(dy)
-        for log in self.logs:
-            log.move_down(dy)
+class Lane(simulation.Lane):
+    __slots__ = ()
+    
+    car_class = Car
+    log_class = Log
     
     def draw(self, surface):
         """Draw the lane and its cars/logs"""
-        pygame.draw.rect(surface, self.color, self.rect)
+        pygame.draw.rect(surface, LANE_COLORS[self.type],
+                         (self.rect.x, self.rect.y, self.rect.width, self.rect.height))
         
         # Draw cars if this is a road
-        if self.type == 'ROAD':
+        if self.type == LANE_ROAD:
             for car in self.cars:
                 car.draw(surface)
         
         # Draw logs if this is a river
-        elif self.type == 'RIVER':
+        elif self.type == LANE_RIVER:
             for log in self.logs:
                 log.draw(surface)
 
 
-class LaneManager:
-    def __init__(self, start_y=0):
-        self.lanes = []
-        self.camera_y = start_y - SCREEN_HEIGHT * 0.6  # Start camera so player is in lower part of screen
-        
-        # Initialize lanes around the player's starting position
-        # Create lanes from player position and going upward (negative Y)
-        for i in range(30):
-            y = start_y - i * TILE_SIZE  # Start at player Y and go up
-            
-            # Choose lane type with rules: no river after road, no road after river
-            if i == 0:
-                lane_type = 'GRASS'  # First lane is always grass
-            else:
-                prev_lane_type = self.lanes[-1].type
-                lane_type = self.get_valid_lane_type(prev_lane_type)
-            
-            self.lanes.append(Lane(y, lane_type))
-        
-        # Make sure first 5 lanes are grass for safe starting area
-        for i in range(5):
-            self.lanes[i].type = 'GRASS'
-            self.lanes[i].color = GREEN
-    
-    def get_valid_lane_type(self, prev_lane_type):
-        """Get a valid lane type that can follow the previous lane type"""
-        if prev_lane_type == 'ROAD':
-            # After road: can be grass or road (not river)
-            return random.choice(['GRASS', 'ROAD'])
-        elif prev_lane_type == 'RIVER':
-            # After river: can be grass or river (not road)
-            return random.choice(['GRASS', 'RIVER'])
-        else:  # prev_lane_type == 'GRASS'
-            # After grass: can be anything
-            return random.choice(['GRASS', 'ROAD', 'RIVER'])
-    
-    def update_camera(self, player_world_y):
-        """Update camera to follow player with a dead zone and smooth interpolation"""
-        # Dead zone - camera only moves if player is in upper 60% of screen
-        target_camera_y = player_world_y - SCREEN_HEIGHT * 0.6
-        
-        # Smooth camera follow with lerp (linear interpolation)
-        # Instead of jumping instantly, smoothly move toward target
-        if self.camera_y > target_camera_y:
-            # Lerp factor: 0.1 = smooth, 0.5 = snappier, 1.0 = instant
-            lerp_factor = 0.15
-            self.camera_y += (target_camera_y - self.camera_y) * lerp_factor
-        
-        # Generate new lanes ahead of camera (upward direction, negative Y)
-        if self.lanes:
-            highest_lane_y = self.lanes[-1].rect.y
-        else:
-            highest_lane_y = 0
-            
-        while highest_lane_y > self.camera_y - SCREEN_HEIGHT:
-            new_y = highest_lane_y - TILE_SIZE
-            # Get the previous lane type to determine valid next types
-            prev_lane_type = self.lanes[-1].type
-            lane_type = self.get_valid_lane_type(prev_lane_type)
-            new_lane = Lane(new_y, lane_type)
-            self.lanes.append(new_lane)
-            highest_lane_y = new_y
-        
-        # Remove lanes that are far behind camera (lanes below the visible area)
-        # Since we're moving upward (negative Y), we want to keep lanes that are NOT too far below
-        # Keep lanes that are above camera_y (lower values) or within 2 screens below
-        self.lanes = [lane for lane in self.lanes if lane.rect.y < self.camera_y + SCREEN_HEIGHT * 2]
-    
-    def update(self):
-        """Update all lanes (spawns and moves cars)"""
-        for lane in self.lanes:
-            lane.update()
+class LaneBackground:
+    """
+    Cached lane backgrounds, stored in a tall wrap-around surface indexed by lane row
     
-    def check_collision(self, player_rect):
-        """Check if player collides with any car"""
-        for lane in self.lanes:
-            if lane.type == 'ROAD':
-                for car in lane.cars:
-                    if player_rect.colliderect(car.rect):
-                        return True
-        return False
-    
-    def get_player_lane(self, player_y):
-        """Get the lane the player is currently on"""
-        for lane in self.lanes:
-            # Check if player's Y position is within this lane
-            if lane.rect.y <= player_y < lane.rect.y + TILE_SIZE:
-                return lane
-        return None
-    
-    def handle_river_logic(self, player):
-        """Handle river physics: player must be on a log or drown"""
-        player_lane = self.get_player_lane(player.y)
-        
-        if player_lane and player_lane.type == 'RIVER':
-            # Player is on a river - check if they're on a log
-            on_log = False
-            
-            for log in player_lane.logs:
-                if player.rect.colliderect(log.rect):
-                    on_log = True
-                    # Move player with the log (parenting)
-                    player.x += log.speed * log.direction
-                    player.rect.x = player.x
-                    break
-            
-            # If not on any log, player drowns
-            if not on_log:
-                return True  # Game over
-            
-            # Check if player was pushed off screen by log
-            if player.x < 0 or player.x + player.size > SCREEN_WIDTH:
-                return True  # Game over
-        
-        return False  # Player is safe
+    Each row is painted once when it first scrolls into view, and overwritten when a row
+    further up reuses its slot, so drawing the whole background is one or two blits.
+    """
     
-    def draw(self, surface):
-        """Draw all lanes with camera offset"""
+    def __init__(self):
+        # One slot per row, enough to cover the screen plus a partial row at each edge
+        self.slot_count = SCREEN_HEIGHT // TILE_SIZE + 2
+        self.height = self.slot_count * TILE_SIZE
+        self.surface = None  # Created on first draw, once pygame is initialized
+        # Lane type painted in each slot (None = grass filler); compared by type rather than lane
+        # object, since lane objects are recycled for new rows and new games
+        self.painted = [None] * self.slot_count
+        self.painted_rows = [None] * self.slot_count  # Row painted in each slot
+    
+    def draw(self, surface, lane_manager, camera_y):
+        """Blit the lanes under the camera onto surface, returns the camera's integer pixel offset"""
+        if self.surface is None:
+            self.surface = pygame.Surface((SCREEN_WIDTH, self.height))
+            if pygame.display.get_surface() is not None:
+                self.surface = self.surface.convert()
+        
+        # Integer scroll position, matching how pygame truncates the fractional lane positions
+        offset = math.ceil(camera_y - lane_manager.start_y)
+        
+        # Paint rows that scrolled into view (rows without a lane stay plain grass)
+        first_row = offset // TILE_SIZE
+        for row in range(first_row, first_row + self.slot_count):
+            slot = row % self.slot_count
+            lane = lane_manager.rows.get(row)
+            lane_type = lane.type if lane is not None else None
+            if self.painted_rows[slot] != row or self.painted[slot] != lane_type:
+                color = LANE_COLORS[lane_type] if lane is not None else GREEN
+                self.surface.fill(color, (0, slot * TILE_SIZE, SCREEN_WIDTH, TILE_SIZE))
+                self.painted[slot] = lane_type
+                self.painted_rows[slot] = row
+        
+        # Blit the visible part, wrapping around the bottom of the cached surface if needed
+        top = offset % self.height
+        first_part = min(SCREEN_HEIGHT, self.height - top)
+        surface.blit(self.surface, (0, 0), (0, top, SCREEN_WIDTH, first_part))
+        if first_part < SCREEN_HEIGHT:
+            surface.blit(self.surface, (0, first_part), (0, 0, SCREEN_WIDTH, SCREEN_HEIGHT - first_part))
+        
+        return offset
+
+
+# Shared by every LaneManager (slots remember which row and lane type they hold, so restarts just repaint)
+lane_background = LaneBackground()
+
+
+class LaneManager(simulation.LaneManager):
+    lane_class = Lane
+    
+    def draw(self, surface, drawn_rects=None, alpha=1.0, background=None):
+        """
+        Draw all lanes with camera offset, returns the camera's integer pixel offset
+        
+        If drawn_rects is a list, the screen area of every car and log drawn is appended to it.
+        alpha blends positions between the last two simulation ticks (0 = previous, 1 = current).
+        background is the LaneBackground cache to use (the shared lane_background by default).
+        """
+        camera_y = self.get_render_camera_y(alpha)
+        
+        # Lane backgrounds come from the cache and cover the whole screen
+        if background is None:
+            background = lane_background
+        offset = background.draw(surface, self, camera_y)
+        
+        clip = surface.get_clip()
         for lane in self.lanes:
             # Calculate screen position based on camera
-            screen_y = lane.rect.y - self.camera_y
+            screen_y = lane.rect.y - self.start_y - offset
             
-            # Only draw if on screen
+            # Only draw if on screen and there is something in the lane
+            # (a lane outside the active window may still need to catch up first)
             if -TILE_SIZE <= screen_y <= SCREEN_HEIGHT:
-                # Draw lane
-                pygame.draw.rect(surface, lane.color, (0, screen_y, SCREEN_WIDTH, TILE_SIZE))
+                self.sync_lane(lane)
+            if -TILE_SIZE <= screen_y <= SCREEN_HEIGHT and (lane.cars or lane.logs):
+                # Obstacles are clipped to their lane, the lane above covers the top of their voxel
+                surface.set_clip(clip.clip((0, screen_y, SCREEN_WIDTH, TILE_SIZE)))
                 
-                # Draw cars
-                if lane.type == 'ROAD':
-                    for car in lane.cars:
-                        car_screen_y = car.y - self.camera_y
-                        # Update car's drawing position temporarily for voxel rendering
-                        original_y = car.y
-                        car.y = car_screen_y
-                        car.draw(surface)
-                        car.y = original_y  # Restore world position
-                
-                # Draw logs
-                elif lane.type == 'RIVER':
-                    for log in lane.logs:
-                        log_screen_y = log.y - self.camera_y
-                        # Update log's drawing position temporarily for voxel rendering
-                        original_y = log.y
-                        log.y = log_screen_y
-                        log.draw(surface)
-                        log.y = original_y  # Restore world position
-
-
-def draw_menu(surface, menu_cars):
-    """Draw the menu screen with title, instructions, and background cars"""
-    # Fill background with green
-    surface.fill(GREEN)
+                # Draw cars or logs at their interpolated screen position
+                obstacles = lane.cars if lane.type == LANE_ROAD else lane.logs
+                for obstacle in obstacles:
+                    x = lerp(obstacle.prev_x, obstacle.x, alpha)
+                    rect = obstacle.draw(surface, x, obstacle.y - camera_y)
+                    if drawn_rects is not None:
+                        drawn_rects.append(rect)
+        surface.set_clip(clip)
+        
+        return offset
+
+
+class TextCache:
+    """
+    Rendered text and full-screen overlay surfaces, so static screens are just blits
     
-    # Draw some decorative road lanes in the background
-    for i in range(3):
-        lane_y = 150 + i * 120
-        pygame.draw.rect(surface, DARK_GRAY, (0, lane_y, SCREEN_WIDTH, TILE_SIZE))
+    Surfaces are keyed by what they show (font size, string, color) and the least recently
+    used ones are dropped once more than max_size are cached, so a changing string like the
+    score doesn't grow the cache forever.
+    """
     
-    # Update and draw background cars
+    def __init__(self, max_size=32):
+        self.max_size = max_size
+        self.fonts = {}  # Font size -> pygame Font (loaded on first use)
+        self.surfaces = OrderedDict()  # Key -> Surface, oldest first
+    
+    def font(self, size):
+        """Get the default font at the given size"""
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+    
+    def _get(self, key, create):
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.surfaces[key] = create()
+            if len(self.surfaces) > self.max_size:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+    
+    def text(self, size, string, color):
+        """Get string rendered (antialiased) in the default font at the given size and color"""
+        return self._get(('text', size, string, color),
+                         lambda: self.font(size).render(string, True, color))
+    
+    def overlay(self, alpha, color=BLACK):
+        """Get a semi-transparent full-screen overlay"""
+        def create():
+            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            if pygame.display.get_surface() is not None:
+                overlay = overlay.convert()
+            overlay.set_alpha(alpha)
+            overlay.fill(color)
+            return overlay
+        return self._get(('overlay', alpha, color), create)
+
+
+# Shared by the menu, HUD and game over screens
+text_cache = TextCache()
+
+
+def update_menu_cars(menu_cars):
+    """Move the menu's background cars by one tick, wrapping them around the screen"""
     for car in menu_cars:
         car.update()
-        car.draw(surface)
         
         # Reset car position if it goes off screen
         if car.direction > 0 and car.x > SCREEN_WIDTH:
             car.x = -car.width
+            car.prev_x = car.x
         elif car.direction < 0 and car.x + car.width < 0:
             car.x = SCREEN_WIDTH
+            car.prev_x = car.x
+
+
+def draw_menu(surface, menu_cars, alpha=1.0):
+    """Draw the menu screen with title, instructions, and background cars"""
+    # Fill background with green
+    surface.fill(GREEN)
+    
+    # Draw some decorative road lanes in the background
+    for i in range(3):
+        lane_y = 150 + i * 120
+        pygame.draw.rect(surface, DARK_GRAY, (0, lane_y, SCREEN_WIDTH, TILE_SIZE))
+    
+    # Draw background cars (interpolated between the last two ticks)
+    for car in menu_cars:
+        car.draw(surface, lerp(car.prev_x, car.x, alpha))
     
     # Semi-transparent overlay for better text readability
-    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    overlay.set_alpha(120)
-    overlay.fill(BLACK)
-    surface.blit(overlay, (0, 0))
+    surface.blit(text_cache.overlay(120), (0, 0))
     
     # Draw title
-    title_font = pygame.font.Font(None, 92)
-    title_text = title_font.render('CROSSY ROAD', True, YELLOW)
+    title_text = text_cache.text(TITLE_FONT_SIZE, 'CROSSY ROAD', YELLOW)
     title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 80))
     
     # Draw title shadow for depth
-    shadow_text = title_font.render('CROSSY ROAD', True, DARK_GRAY)
+    shadow_text = text_cache.text(TITLE_FONT_SIZE, 'CROSSY ROAD', DARK_GRAY)
     shadow_rect = shadow_text.get_rect(center=(SCREEN_WIDTH // 2 + 4, SCREEN_HEIGHT // 2 - 76))
     surface.blit(shadow_text, shadow_rect)
     surface.blit(title_text, title_rect)
     
     # Draw instruction text
-    instruction_text = font.render('Press SPACE to Start', True, WHITE)
+    instruction_text = text_cache.text(FONT_SIZE, 'Press SPACE to Start', WHITE)
     instruction_rect = instruction_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
     surface.blit(instruction_text, instruction_rect)
     
     # Draw controls text
-    controls_font = pygame.font.Font(None, 28)
-    controls_text = controls_font.render('Use Arrow Keys to Move', True, WHITE)
+    controls_text = text_cache.text(CONTROLS_FONT_SIZE, 'Use Arrow Keys to Move', WHITE)
     controls_rect = controls_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 60))
     surface.blit(controls_text, controls_rect)
+    
+    # Draw autopilot text
+    autopilot_text = text_cache.text(CONTROLS_FONT_SIZE, 'Press A to watch the Autopilot', WHITE)
+    autopilot_rect = autopilot_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 90))
+    surface.blit(autopilot_text, autopilot_rect)
 
 
 def draw_ui(surface, score):
-    """Draw the score UI at the top of the screen"""
-    score_text = font.render(f'Score: {score}', True, WHITE)
-    surface.blit(score_text, (10, 10))
+    """Draw the score UI at the top of the screen, returns the screen area drawn"""
+    # Only rendered again when the score changes
+    score_text = text_cache.text(FONT_SIZE, f'Score: {score}', WHITE)
+    return surface.blit(score_text, (10, 10))
 
 
 def draw_game_over(surface, score):
     """Draw game over screen"""
     # Semi-transparent overlay
-    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    overlay.set_alpha(180)
-    overlay.fill(BLACK)
-    surface.blit(overlay, (0, 0))
+    surface.blit(text_cache.overlay(180), (0, 0))
     
     # Game over text
-    game_over_text = large_font.render('GAME OVER', True, RED)
+    game_over_text = text_cache.text(LARGE_FONT_SIZE, 'GAME OVER', RED)
     game_over_rect = game_over_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
     surface.blit(game_over_text, game_over_rect)
     
     # Score text
-    score_text = font.render(f'Final Score: {score}', True, WHITE)
+    score_text = text_cache.text(FONT_SIZE, f'Final Score: {score}', WHITE)
     score_rect = score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
     surface.blit(score_text, score_rect)
     
     # Restart instruction
-    restart_text = font.render('Press R to Restart', True, WHITE)
+    restart_text = text_cache.text(FONT_SIZE, 'Press R to Restart', WHITE)
     restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 70))
     surface.blit(restart_text, restart_rect)
     
     # Menu instruction
-    menu_text = font.render('Press M for Menu', True, WHITE)
+    menu_text = text_cache.text(FONT_SIZE, 'Press M for Menu', WHITE)
     menu_rect = menu_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 110))
     surface.blit(menu_text, menu_rect)
 
 
-class Player:
+class Player(simulation.Player):
     def __init__(self, x, y):
-        self.x = x
-        self.y = y  # World Y position
+        super().__init__(x, y)
         self.color = YELLOW
         self.dark_color = DARK_YELLOW
-        self.size = TILE_SIZE
-        self.rect = pygame.Rect(self.x, self.y, self.size, self.size)
-        self.score = 0  # Track highest lane reached
-        self.highest_y = y  # Track highest Y position (lower/more negative values = further up)
-        
-        # Hop animation properties
-        self.is_hopping = False
-        self.hop_progress = 0  # 0.0 to 1.0
-        self.hop_speed = 0.15  # How fast the hop completes (higher = faster)
-        
-        # Facing direction: 'up', 'down', 'left', 'right'
-        self.facing = 'up'  # Default facing up
-    
-    def move(self, dx, dy):
-        """Move player by dx, dy tiles in world space"""
-        new_x = self.x + dx * TILE_SIZE
-        new_y = self.y + dy * TILE_SIZE
-        
-        # Update facing direction
-        if dx < 0:
-            self.facing = 'left'
-        elif dx > 0:
-            self.facing = 'right'
-        elif dy < 0:
-            self.facing = 'up'
-        elif dy > 0:
-            self.facing = 'down'
-        
-        # Keep player within horizontal bounds
-        if dx != 0:  # Horizontal movement
-            if 0 <= new_x <= SCREEN_WIDTH - self.size:
-                self.x = new_x
-                self.rect.x = self.x
-                # Trigger hop animation
-                self.is_hopping = True
-                self.hop_progress = 0
-        
-        # Vertical movement
-        if dy != 0:
-            self.y = new_y
-            self.rect.y = self.y
-            # Trigger hop animation
-            self.is_hopping = True
-            self.hop_progress = 0
-            
-            if dy < 0:  # Moving up (negative Y in world space)
-                # Update score when moving up
-                if self.y < self.highest_y:
-                    self.highest_y = self.y
-                    self.score += 1
-    
-    def update(self):
-        """Update hop animation"""
-        if self.is_hopping:
-            self.hop_progress += self.hop_speed
-            if self.hop_progress >= 1.0:
-                self.hop_progress = 1.0
-                self.is_hopping = False
-    
-    def get_hop_offset(self):
-        """Calculate the vertical offset for the hop animation using sine wave"""
-        if not self.is_hopping:
-            return 8  # Default voxel depth
-        
-        # Use sine wave for smooth hop animation
-        # sin goes from 0 -> 1 -> 0 over the range 0 -> pi
-        hop_height = math.sin(self.hop_progress * math.pi) * 12  # Max additional height of 12 pixels
-        return 8 + hop_height  # Base depth of 8 + animation offset
-    
-    def get_screen_y(self, camera_y):
-        """Get player's Y position on screen based on camera"""
-        return self.y - camera_y
-    
-    def reset(self, x, y):
-        """Reset player to starting position"""
-        self.x = x
-        self.y = y
-        self.rect.x = self.x
-        self.rect.y = self.y
-        self.score = 0
-        self.highest_y = y
-        self.is_hopping = False
-        self.hop_progress = 0
-        self.facing = 'up'
-    
-    def draw(self, surface, camera_y):
-        """Draw the chicken player on the screen with camera offset and voxel effect"""
-        screen_y = self.y - camera_y
-        hop_offset = self.get_hop_offset()
+    
+    def draw(self, surface, camera_y, alpha=1.0):
+        """
+        Draw the chicken player on the screen with camera offset by blitting its cached sprite
         
+        alpha blends between the last two simulation ticks (0 = previous, 1 = current).
+        Returns the screen area drawn.
+        """
+        screen_y = self.y - camera_y
+        # Hop depth is bucketed to whole pixels so each facing only needs a handful of sprites
+        hop_depth = int(self.get_hop_offset(alpha))
+        
+        # Room around the tile for the head, beak and comb sticking out and the hop lifting the chicken
+        pad_x = self.size // 2
+        pad_top = self.size
+        sprite = sprite_cache.get(('chicken', self.facing, hop_depth),
+                                  (self.size + pad_x * 2, self.size + pad_top + pad_x),
+                                  (pad_x, pad_top),
+                                  lambda sprite, x, y: self.render(sprite, x, y, hop_depth))
+        return surface.blit(sprite, (int(self.get_render_x(alpha)) - pad_x, int(screen_y) - pad_top))
+    
+    def render(self, surface, x, screen_y, hop_offset):
+        """Draw the chicken at (x, screen_y) with voxel effect, lifted by hop_offset"""
         # Body dimensions (larger, main body)
         body_width = self.size * 0.75
         body_height = self.size * 0.6
-        body_x = self.x + (self.size - body_width) / 2
+        body_x = x + (self.size - body_width) / 2
         body_y = screen_y + self.size * 0.3
         
         # Head dimensions (smaller, on top of body)
@@ -683,7 +550,7 @@ class Player:
         elif self.facing == 'right':
             head_offset_x = head_size * 0.4  # Head to the right
         
-        head_x = self.x + (self.size - head_size) / 2 + head_offset_x
+        head_x = x + (self.size - head_size) / 2 + head_offset_x
         head_y = screen_y + self.size * 0.1 + head_offset_y
         
         # Comb dimensions (tiny red rectangle on top of head)
@@ -762,14 +629,166 @@ class Player:
             pygame.draw.rect(surface, BLACK, (int(eye_x_right), int(eye_y), eye_size, eye_size))
 
 
-def main():
-    # Create player in world space at bottom of screen
-    start_x = SCREEN_WIDTH // 2 - TILE_SIZE // 2
-    start_y = SCREEN_HEIGHT - TILE_SIZE * 3  # Start near bottom
-    player = Player(start_x, start_y)
+class DirtyRectRenderer:
+    """
+    Pushes only the changed parts of the screen to the display with pygame.display.update(rects)
+    
+    The whole frame is still drawn to the screen surface every frame; only the copy to the
+    display is limited to the rects that changed (this frame's and last frame's sprite areas).
+    Anything that moves the whole view, like a camera scroll, falls back to a full flip.
+    """
+    
+    def __init__(self, verify=False):
+        self.previous_rects = []
+        self.force_full = True  # First frame has to be pushed completely
+        
+        # Verification: keep a copy of what the display should be showing and compare it
+        # with the full frame, which is exactly what the full-flip path would have shown
+        self.verify = verify
+        self.shown = None
+        self.frames = 0
+        self.full_frames = 0
+        self.mismatched_frames = 0
+    
+    def invalidate(self):
+        """Make the next frame a full flip (after a state change or anything else that changes everything)"""
+        self.force_full = True
+    
+    def present(self, surface, rects, full=False):
+        """Push the frame to the display, updating only rects unless full is True"""
+        self.frames += 1
+        if full or self.force_full:
+            pygame.display.flip()
+            self.full_frames += 1
+            self.force_full = False
+            if self.verify:
+                self.shown = surface.copy()
+        else:
+            changed = rects + self.previous_rects
+            pygame.display.update(changed)
+            if self.verify:
+                for rect in changed:
+                    self.shown.blit(surface, rect, rect)
+                if pygame.image.tobytes(self.shown, 'RGB') != pygame.image.tobytes(surface, 'RGB'):
+                    self.mismatched_frames += 1
+                    # Resync so one miss is not counted again on every following frame
+                    self.shown = surface.copy()
+        self.previous_rects = rects
+    
+    def report(self):
+        """Summary of how many frames needed a full flip (and, when verifying, how many differed)"""
+        text = f'Dirty rect renderer: {self.full_frames}/{self.frames} full flips'
+        if self.verify:
+            text += f', {self.mismatched_frames} frames differed from the full-flip output'
+        return text
+
+
+class ProfilerOverlay:
+    """
+    Debug overlay with the frame profiler's numbers (F3 while playing)
+    
+    Shows FPS, frame time percentiles and the mean time of each frame phase over the
+    profiler's buffer. The text is rendered to its own surface every OVERLAY_REFRESH_FRAMES
+    frames, the other frames only blit it.
+    """
+    
+    def __init__(self):
+        self.visible = False
+        self.surface = None
+        self.frames_until_refresh = 0
+    
+    def toggle(self):
+        self.visible = not self.visible
+        self.frames_until_refresh = 0
+    
+    def refresh(self, profiler):
+        """Render the current numbers"""
+        summary = profiler.summary()
+        lines = [
+            f"{summary['fps']:.1f} FPS  busy {summary['busy']:.2f} ms",
+            f"frame p50 {summary['p50']:.2f}  p95 {summary['p95']:.2f}  p99 {summary['p99']:.2f} ms",
+        ]
+        lines += [f'{name:20} {summary["phases"][name]:6.3f} ms' for name in PHASE_NAMES]
+        
+        font = text_cache.font(OVERLAY_FONT_SIZE)
+        line_height = font.get_linesize()
+        rendered = [font.render(line, True, WHITE) for line in lines]
+        width = max(text.get_width() for text in rendered) + 12
+        self.surface = pygame.Surface((width, line_height * len(lines) + 8))
+        self.surface.set_alpha(190)
+        self.surface.fill(BLACK)
+        for i, text in enumerate(rendered):
+            self.surface.blit(text, (6, 4 + i * line_height))
+    
+    def draw(self, surface, profiler):
+        """Draw the overlay in the top right corner, returns the screen area drawn"""
+        if self.frames_until_refresh <= 0:
+            self.refresh(profiler)
+            self.frames_until_refresh = OVERLAY_REFRESH_FRAMES
+        self.frames_until_refresh -= 1
+        return surface.blit(self.surface, (SCREEN_WIDTH - self.surface.get_width() - 10, 10))
+
+
+def seed_arg(text):
+    """argparse type for --seed: an integer that fits in a replay file"""
+    seed = int(text)
+    if not SEED_MIN <= seed <= SEED_MAX:
+        raise argparse.ArgumentTypeError(f'seed must be between {SEED_MIN} and {SEED_MAX}')
+    return seed
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description='Crossy Road')
+    parser.add_argument('--fps', type=int, default=FPS,
+                        help=f'render frame rate cap, 0 for uncapped (the game always simulates {FPS} ticks per second)')
+    parser.add_argument('--seed', type=seed_arg, default=None,
+                        help='world seed used for every game (default: a new random world each game)')
+    parser.add_argument('--record', metavar='FILE',
+                        help='record each game as a replay (FILE, then FILE-2, FILE-3, ...)')
+    parser.add_argument('--replay', metavar='FILE',
+                        help='watch a recorded replay in real time (use replay.py to check one headless)')
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help='only push changed screen regions to the display (faster on slow displays)')
+    parser.add_argument('--compare-dirty', action='store_true',
+                        help='with --dirty-rects, check every frame against the full-flip output and report differences')
+    parser.add_argument('--autopilot', action='store_true',
+                        help='let the autopilot play every game (also started with A on the menu)')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='write the per-phase times of the last frames to FILE (CSV) on exit, F3 shows them while playing')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='record every frame phase and lane generation burst to FILE as a Chrome trace (chrome://tracing)')
+    return parser.parse_args(argv)
+
+
+def numbered_path(path, number):
+    """Get path for the first file, and path with -2, -3, ... before the extension for later ones"""
+    if number == 1:
+        return path
+    stem, extension = os.path.splitext(path)
+    return f'{stem}-{number}{extension}'
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    screen = init_display()
+    
+    # Optional dirty rectangle renderer (None = always flip the whole screen)
+    dirty_renderer = None
+    if args.dirty_rects or args.compare_dirty:
+        dirty_renderer = DirtyRectRenderer(verify=args.compare_dirty)
+    
+    # Replay being watched (None = the keyboard drives the chicken)
+    playback_replay = Replay.load(args.replay) if args.replay else None
+    seed = playback_replay.seed if playback_replay else args.seed
+    
+    # Per-phase frame times, always collected (it is cheap) and shown with F3 while playing,
+    # and with --trace also every phase of every frame in a Chrome trace
+    profiler = TracingProfiler(args.trace) if args.trace else FrameProfiler()
+    profiler_overlay = ProfilerOverlay()
     
-    # Create lane manager with player's starting position
-    lane_manager = LaneManager(start_y)
+    # Create the world (player in world space at bottom of screen plus the lanes around it)
+    world = World(lane_manager_class=LaneManager, player_class=Player, seed=seed, profiler=profiler)
     
     # Game state
     game_state = STATE_MENU
@@ -783,8 +802,49 @@ def main():
         car_x = random.randint(0, SCREEN_WIDTH) if car_direction > 0 else random.randint(0, SCREEN_WIDTH)
         menu_cars.append(Car(car_x, car_y, car_speed, car_direction))
     
+    # Fixed-timestep simulation: real time is collected in the accumulator and spent in
+    # whole ticks of TICK_SECONDS, rendering blends the last two ticks by the leftover fraction
+    accumulator = TICK_SECONDS  # Run one tick on the first frame
+    frame_seconds = 0.0
+    pending_actions = []  # Hops pressed since the last tick, applied at the start of the next one
+    
+    # Autopilot playing the game instead of the keyboard (None = keyboard)
+    autopilot = Autopilot() if args.autopilot else None
+    
+    # Replay recording (one Replay per game) and playback
+    recording = None
+    games_recorded = 0
+    playback = None
+    
+    def start_game():
+        """Reset the world for a new game and start recording or playing it back"""
+        nonlocal recording, games_recorded, playback
+        world.reset(seed)
+        pending_actions.clear()
+        if playback_replay is not None:
+            playback = ReplayPlayback(playback_replay)
+        if args.record:
+            recording = Replay(world.seed)
+            games_recorded += 1
+    
+    def save_recording():
+        """Write the current game's replay, if one is being recorded"""
+        nonlocal recording
+        if recording is not None:
+            recording.finish(world)
+            recording.save(numbered_path(args.record, games_recorded))
+            recording = None
+    
+    # Replays start right away, without the menu
+    if playback_replay is not None:
+        start_game()
+        game_state = STATE_PLAYING
+    
+    previous_camera_offset = None
     running = True
     while running:
+        previous_state = game_state
+        
         # Event handling
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -797,88 +857,160 @@ def main():
                     if event.key == pygame.K_SPACE:
                         game_state = STATE_PLAYING
                         # Reset game when starting from menu
-                        player.reset(start_x, start_y)
-                        lane_manager = LaneManager(start_y)
+                        start_game()
+                    elif event.key == pygame.K_a:
+                        # Same, but the autopilot plays
+                        autopilot = Autopilot()
+                        game_state = STATE_PLAYING
+                        start_game()
                 
                 elif game_state == STATE_GAMEOVER:
                     # Handle restart
                     if event.key == pygame.K_r:
                         # Reset game and continue playing
-                        player.reset(start_x, start_y)
-                        lane_manager = LaneManager(start_y)
+                        start_game()
                         game_state = STATE_PLAYING
                     elif event.key == pygame.K_m:
-                        # Return to menu
+                        # Return to menu (a replay being watched is left for normal play)
                         game_state = STATE_MENU
-                        player.reset(start_x, start_y)
-                        lane_manager = LaneManager(start_y)
+                        playback_replay = None
+                        playback = None
+                        autopilot = Autopilot() if args.autopilot else None
+                        seed = args.seed
+                        world.reset(seed)
                 
                 elif game_state == STATE_PLAYING:
+                    if event.key == pygame.K_F3:
+                        # Show or hide the performance overlay
+                        profiler_overlay.toggle()
+                        if dirty_renderer is not None:
+                            dirty_renderer.invalidate()
+                    
                     # Normal game controls
-                    if event.key == pygame.K_LEFT:
-                        player.move(-1, 0)
-                    elif event.key == pygame.K_RIGHT:
-                        player.move(1, 0)
-                    elif event.key == pygame.K_UP:
-                        player.move(0, -1)  # Negative Y = move up
-                    elif event.key == pygame.K_DOWN:
-                        player.move(0, 1)  # Positive Y = move down
-        
-        # Update game based on state
+                    elif playback is None and autopilot is None:
+                        if event.key == pygame.K_LEFT:
+                            pending_actions.append(ACTION_LEFT)
+                        elif event.key == pygame.K_RIGHT:
+                            pending_actions.append(ACTION_RIGHT)
+                        elif event.key == pygame.K_UP:
+                            pending_actions.append(ACTION_UP)
+                        elif event.key == pygame.K_DOWN:
+                            pending_actions.append(ACTION_DOWN)
+        profiler.mark(PHASE_EVENTS)
+        
+        # Update game based on state, one fixed tick at a time
+        # (a long hitch is capped so the game slows down instead of freezing to catch up)
+        accumulator += min(frame_seconds, MAX_FRAME_SECONDS)
+        while accumulator >= TICK_SECONDS:
+            accumulator -= TICK_SECONDS
+            if game_state == STATE_MENU:
+                update_menu_cars(menu_cars)
+            elif game_state == STATE_PLAYING:
+                if playback is not None:
+                    pending_actions.extend(playback.actions_for(world.ticks))
+                elif autopilot is not None:
+                    # Recorded like key presses, so autopilot games replay too
+                    action = autopilot.act(world)
+                    if action != ACTION_NONE:
+                        pending_actions.append(action)
+                for action in pending_actions:
+                    world.apply_action(action)
+                    if recording is not None:
+                        recording.record(world.ticks, action)
+                pending_actions.clear()
+                profiler.mark(PHASE_INPUT)
+                # Camera, animation, lanes, river, cars and falling off the screen (the world marks each part)
+                if world.step() or (playback is not None and playback.finished(world)):
+                    game_state = STATE_GAMEOVER
+                    save_recording()
+        profiler.mark(PHASE_INPUT)
+        
+        # Build lanes ahead of time: the next ones up within a small budget while playing (so a quick
+        # run of hops doesn't build them all in one frame), and on the other screens the whole next
+        # game on a worker thread, so starting it is just a swap
         if game_state == STATE_PLAYING:
-            # Update camera to follow player
-            lane_manager.update_camera(player.y)
-            
-            # Update player animation
-            player.update()
-            
-            # Update game state
-            lane_manager.update()  # Update all lanes and cars
-            
-            # Handle river logic (player must be on log or drown)
-            if lane_manager.handle_river_logic(player):
-                game_state = STATE_GAMEOVER
-            
-            # Check for collisions with cars
-            if lane_manager.check_collision(player.rect):
-                game_state = STATE_GAMEOVER
-            
-            # Check if player fell off the bottom of the screen
-            if player.get_screen_y(lane_manager.camera_y) > SCREEN_HEIGHT:
-                game_state = STATE_GAMEOVER
+            world.lane_manager.pregenerate()
+        else:
+            world.prepare_in_background(seed)
+        profiler.mark(PHASE_PREGENERATE)
+        
+        # How far we are between the last tick and the next one
+        alpha = accumulator / TICK_SECONDS
+        
+        player = world.player
+        lane_manager = world.lane_manager
         
         # Render based on state
+        # Screen areas that changed this frame, and whether the whole view changed
+        drawn_rects = []
+        full_redraw = True
         if game_state == STATE_MENU:
-            draw_menu(screen, menu_cars)
+            draw_menu(screen, menu_cars, alpha)
+            profiler.mark(PHASE_DRAW_UI)
         
         elif game_state == STATE_PLAYING:
-            # Fill background
-            screen.fill(GREEN)
-            
-            # Draw lanes and cars with camera offset
-            lane_manager.draw(screen)
+            # Draw lanes (cached backgrounds cover the whole screen) and cars with camera offset
+            camera_offset = lane_manager.draw(screen, drawn_rects, alpha)
+            profiler.mark(PHASE_DRAW_LANES)
             
             # Draw player with camera offset
-            player.draw(screen, lane_manager.camera_y)
+            drawn_rects.append(player.draw(screen, lane_manager.get_render_camera_y(alpha), alpha))
+            profiler.mark(PHASE_DRAW_PLAYER)
             
             # Draw UI
-            draw_ui(screen, player.score)
+            drawn_rects.append(draw_ui(screen, player.score))
+            profiler.mark(PHASE_DRAW_UI)
+            
+            # Draw the performance overlay
+            if profiler_overlay.visible:
+                drawn_rects.append(profiler_overlay.draw(screen, profiler))
+                profiler.mark(PHASE_OVERLAY)
+            
+            # A camera scroll moves everything on screen
+            full_redraw = camera_offset != previous_camera_offset
+            previous_camera_offset = camera_offset
         
         elif game_state == STATE_GAMEOVER:
-            # Keep the game screen visible in background
-            screen.fill(GREEN)
+            # Keep the game screen visible in background (frozen at the final tick)
             lane_manager.draw(screen)
+            profiler.mark(PHASE_DRAW_LANES)
             player.draw(screen, lane_manager.camera_y)
+            profiler.mark(PHASE_DRAW_PLAYER)
             draw_ui(screen, player.score)
             
             # Draw game over overlay
             draw_game_over(screen, player.score)
+            profiler.mark(PHASE_DRAW_UI)
+            
+            # Nothing moves behind the overlay, so only the first frame needs pushing
+            full_redraw = False
         
         # Update display
-        pygame.display.flip()
-        
-        # Maintain FPS
-        clock.tick(FPS)
+        if dirty_renderer is not None:
+            if game_state != previous_state:
+                dirty_renderer.invalidate()
+            dirty_renderer.present(screen, drawn_rects, full_redraw)
+        else:
+            pygame.display.flip()
+        profiler.mark(PHASE_FLIP)
+        
+        # Cap the render rate (0 = as fast as possible), the simulation rate does not depend on it
+        frame_seconds = clock.tick(args.fps) / 1000
+        profiler.mark(PHASE_WAIT)
+        profiler.end_frame()
+    
+    # Keep the game in progress when quitting mid-game (useful for bug reports)
+    save_recording()
+    
+    if dirty_renderer is not None:
+        print(dirty_renderer.report())
+    
+    if args.trace:
+        profiler.close()
+    if args.profile:
+        profiler.write(args.profile)
+    if args.profile or args.trace:
+        print(profiler.report())
     
     pygame.quit()
     sys.exit()
@@ -0,0 +1,106 @@
+import numpy as np
+
+from simulation import SCREEN_WIDTH, TILE_SIZE, LANE_GRASS, LANE_ROAD, LANE_RIVER
+
+# This file turns a World into a fixed-shape occupancy grid for agents, so they never have to walk
+# lane.cars / lane.logs themselves. The grid is float32 with shape (CHANNELS, GRID_ROWS, GRID_COLUMNS):
+# one row per lane from GRID_ROWS_AHEAD lanes ahead of the player to GRID_ROWS_BEHIND lanes behind
+# (the player's lane is row GRID_ROWS_AHEAD), one column per TILE_SIZE cell across the screen.
+# A cell is 1 in the car/log channel if any part of a car/log overlaps it.
+
+GRID_ROWS_AHEAD = 10
+GRID_ROWS_BEHIND = 3
+GRID_ROWS = GRID_ROWS_AHEAD + 1 + GRID_ROWS_BEHIND
+GRID_COLUMNS = SCREEN_WIDTH // TILE_SIZE
+
+# Channels
+CHANNEL_GRASS = 0
+CHANNEL_ROAD = 1
+CHANNEL_RIVER = 2
+CHANNEL_CAR = 3
+CHANNEL_LOG = 4
+CHANNEL_VELOCITY = 5  # Lane speed * direction / MAX_SPEED, the same across the whole row
+CHANNEL_PLAYER = 6
+CHANNELS = 7
+
+GRID_SHAPE = (CHANNELS, GRID_ROWS, GRID_COLUMNS)
+
+MAX_SPEED = 5  # Fastest car speed, used to scale the velocity channel to -1..1
+
+TERRAIN_CHANNELS = {LANE_GRASS: CHANNEL_GRASS, LANE_ROAD: CHANNEL_ROAD, LANE_RIVER: CHANNEL_RIVER}
+
+
+class GridObserver:
+    """
+    Builds occupancy grids for one world at a time
+
+    The lane channels (terrain and velocity) only change when the player changes lane, so they are
+    kept per lane row and reused until then. Car and log cells are rebuilt every tick from the
+    obstacle spans with a few array operations (no loop over cells).
+    """
+
+    def __init__(self):
+        # Per-row lane features for the current player row: grass, road, river, velocity
+        self._lanes = np.zeros((4, GRID_ROWS, 1), dtype=np.float32)
+        self._lanes_key = None  # (lane manager, player row) the lane features were built for
+
+    def _update_lanes(self, lane_manager, player_row):
+        """Rebuild the per-row lane features if the player moved to another lane (or world)"""
+        key = (lane_manager, player_row)
+        if key == self._lanes_key:
+            return
+        lanes = self._lanes
+        lanes.fill(0)
+        for i, row in enumerate(range(player_row - GRID_ROWS_AHEAD, player_row + GRID_ROWS_BEHIND + 1)):
+            lane = lane_manager.rows.get(row)
+            if lane is None:
+                continue  # Not generated yet (or already culled): all zeros
+            lanes[TERRAIN_CHANNELS[lane.type], i] = 1
+            if lane.type == LANE_ROAD:
+                lanes[3, i] = lane.car_speed * lane.car_direction / MAX_SPEED
+            elif lane.type == LANE_RIVER:
+                lanes[3, i] = lane.log_speed * lane.log_direction / MAX_SPEED
+        self._lanes_key = key
+
+    def observe(self, world, out=None):
+        """Build the grid for the world (into out, if given, to avoid allocating), returns it"""
+        if out is None:
+            out = np.empty(GRID_SHAPE, dtype=np.float32)
+
+        lane_manager = world.lane_manager
+        player = world.player
+        player_row = lane_manager.row_of(player.y)
+        first_row = player_row - GRID_ROWS_AHEAD
+        self._update_lanes(lane_manager, player_row)
+
+        lanes = self._lanes
+        out[CHANNEL_GRASS:CHANNEL_RIVER + 1] = lanes[:3]
+        out[CHANNEL_VELOCITY] = lanes[3]
+
+        # Obstacle coverage: mark +1 at each span's first cell and -1 after its last cell, then a
+        # running sum along each row is > 0 exactly on covered cells
+        rows, xs, widths = lane_manager.get_obstacles_in_rows(range(first_row, first_row + GRID_ROWS))
+        rows = np.asarray(rows, dtype=np.int64) - first_row
+        xs = np.asarray(xs, dtype=np.float64)
+        start = np.clip(np.floor(xs / TILE_SIZE), 0, GRID_COLUMNS).astype(np.int64)
+        end = np.clip(np.ceil((xs + np.asarray(widths)) / TILE_SIZE), 0, GRID_COLUMNS).astype(np.int64)
+        stride = GRID_COLUMNS + 1  # One spare column per row so an end marker never spills into the next row
+        edges = (np.bincount(rows * stride + start, minlength=GRID_ROWS * stride)
+                 - np.bincount(rows * stride + end, minlength=GRID_ROWS * stride))
+        covered = np.cumsum(edges.reshape(GRID_ROWS, stride)[:, :GRID_COLUMNS], axis=1) > 0
+
+        # Cars only live on roads and logs only on rivers
+        np.multiply(covered, lanes[1], out=out[CHANNEL_CAR])
+        np.multiply(covered, lanes[2], out=out[CHANNEL_LOG])
+
+        # Cells the player's rect overlaps, in the player's row
+        out[CHANNEL_PLAYER] = 0
+        start = max(0, int(player.x // TILE_SIZE))
+        end = min(GRID_COLUMNS, -int(-(player.x + player.size) // TILE_SIZE))
+        out[CHANNEL_PLAYER, GRID_ROWS_AHEAD, start:end] = 1
+        return out
+
+
+def observe_grid(world, out=None):
+    """Build one occupancy grid for the world (see GridObserver to reuse lane features across ticks)"""
+    return GridObserver().observe(world, out)
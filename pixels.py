@@ -0,0 +1,71 @@
+import os
+
+# Render without a window (must be set before pygame's display is initialized)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import time
+
+import pygame
+
+import main
+from simulation import SCREEN_WIDTH, SCREEN_HEIGHT, World
+
+# This file renders worlds to small off-screen images for vision-based agents. Each frame is drawn
+# by the game's own LaneManager.draw / Player.draw into a full size off-screen surface, scaled down
+# into a second surface of the requested size, and handed out as a NumPy array that is a view of
+# that surface's pixels (no copy). No window is opened.
+# Run "python pixels.py" to measure frames per second.
+
+
+class PixelRenderer:
+    """
+    Renders a world into a (height, width, 3) uint8 RGB array
+
+    The array returned by render() is the same object every time: a live view of the scaled
+    surface, overwritten by the next render(). Copy it if you need to keep a frame.
+    Worlds must be built with the drawable classes (see make_world).
+    """
+
+    lane_manager_class = main.LaneManager
+    player_class = main.Player
+
+    def __init__(self, width=84, height=84, smooth=False):
+        self.size = (width, height)
+        self.smooth = smooth  # Average pixels when scaling down (slower, less aliasing)
+        self.frame = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.output = pygame.Surface(self.size)
+        # Own background cache, so several renderers (or the game window) do not repaint each other's
+        self.background = main.LaneBackground()
+        # surfarray gives (x, y, channel); transposing is still a view of the surface memory
+        self.pixels = pygame.surfarray.pixels3d(self.output).transpose(1, 0, 2)
+
+    def make_world(self, seed=None):
+        """Create a World that this renderer can draw"""
+        return World(lane_manager_class=self.lane_manager_class, player_class=self.player_class, seed=seed)
+
+    def render(self, world, alpha=1.0):
+        """Draw the world (as the game would show it) and return the scaled pixel view"""
+        lane_manager = world.lane_manager
+        lane_manager.draw(self.frame, alpha=alpha, background=self.background)
+        world.player.draw(self.frame, lane_manager.get_render_camera_y(alpha), alpha)
+        if self.smooth:
+            pygame.transform.smoothscale(self.frame, self.size, self.output)
+        else:
+            pygame.transform.scale(self.frame, self.size, self.output)
+        return self.pixels
+
+
+if __name__ == "__main__":
+    for width, height, smooth in ((84, 84, False), (84, 84, True), (160, 120, False)):
+        renderer = PixelRenderer(width, height, smooth)
+        world = renderer.make_world(seed=0)
+        frames = 2000
+        start = time.perf_counter()
+        for tick in range(frames):
+            if tick % 12 == 0:
+                world.move(0, -1)
+            if world.step():
+                world.reset(tick)
+            renderer.render(world)
+        elapsed = time.perf_counter() - start
+        print(f"{width}x{height}{' smooth' if smooth else ''}: {frames / elapsed:.0f} frames/s (including simulation)")
@@ -0,0 +1,228 @@
+import csv
+import json
+import queue
+import threading
+import time
+from array import array
+
+# This file contains the frame profiler behind the in-game performance overlay (F3 while playing).
+# The game loop (and World.step, when given a profiler) calls mark(phase) as it finishes each part
+# of a frame. The time since the previous mark is added to that phase in the current frame's row of
+# a ring buffer, so collecting costs one perf_counter call and one add per phase, a few microseconds
+# a frame. The last PROFILE_FRAMES frames are kept and can be written out as CSV.
+# TracingProfiler also records every phase (and spans like lane generation bursts) to a Chrome
+# trace_event JSON file, which chrome://tracing or https://ui.perfetto.dev can open.
+# It never imports pygame, like simulation.py.
+
+# Frame phases, in the order the game loop runs them (simulation phases repeat once per tick)
+PHASE_EVENTS = 0  # pygame.event.get and key handling
+PHASE_INPUT = 1  # Menu cars, replay/autopilot actions and applying hops
+PHASE_CAMERA = 2  # LaneManager.update_camera, including generating and culling lanes
+PHASE_PLAYER = 3  # Player.update
+PHASE_LANES = 4  # LaneManager.update
+PHASE_CHECKS = 5  # River, car and falling-off checks
+PHASE_PREGENERATE = 6  # Building lanes ahead of time (LaneManager.pregenerate, World.prepare_in_background)
+PHASE_DRAW_LANES = 7  # LaneManager.draw
+PHASE_DRAW_PLAYER = 8  # Player.draw
+PHASE_DRAW_UI = 9  # draw_ui, plus the menu and game over screens
+PHASE_OVERLAY = 10  # The profiler overlay itself
+PHASE_FLIP = 11  # display.flip (or the dirty rect update)
+PHASE_WAIT = 12  # Clock.tick sleeping to cap the frame rate
+
+PHASE_NAMES = ('events', 'input', 'update_camera', 'player.update', 'lane_manager.update', 'checks',
+               'pregenerate', 'LaneManager.draw', 'Player.draw', 'draw_ui', 'overlay', 'display.flip', 'wait')
+PHASE_COUNT = len(PHASE_NAMES)
+
+PROFILE_FRAMES = 600  # Frames kept in the ring buffer (10 seconds at 60 fps)
+
+# Traces are handed to the writer thread every this many frames, and at most this many batches
+# wait for it (later ones are dropped and counted, so a stalled disk can't eat all the memory)
+TRACE_BATCH_FRAMES = 30
+TRACE_QUEUE_BATCHES = 64
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (0 if it is empty)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+class FrameProfiler:
+    """
+    Per-phase frame times for the last `frames` frames
+
+    times holds one row of PHASE_COUNT seconds per frame; the row of the frame in progress is
+    frame % frames, and it is cleared when the frame before it ends.
+    """
+
+    def __init__(self, frames=PROFILE_FRAMES):
+        self.frames = frames
+        self.times = array('d', bytes(8 * frames * PHASE_COUNT))
+        self.empty_row = array('d', bytes(8 * PHASE_COUNT))
+        self.frame = 0  # Frames finished so far
+        self.row = 0  # Offset of the current frame's row in times
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        """Add the time since the last mark to phase in the current frame"""
+        now = time.perf_counter()
+        self.times[self.row + phase] += now - self.last
+        self.last = now
+
+    def span(self, name, start, **args):
+        """Record a named span from start (a perf_counter time) to now, only kept by TracingProfiler"""
+
+    def end_frame(self):
+        """Finish the current frame and start recording the next one"""
+        self.frame += 1
+        row = self.row = self.frame % self.frames * PHASE_COUNT
+        self.times[row:row + PHASE_COUNT] = self.empty_row
+
+    def rows(self):
+        """Get the finished frames still in the buffer, oldest first, as lists of seconds per phase"""
+        count = min(self.frame, self.frames - 1)
+        rows = []
+        for frame in range(self.frame - count, self.frame):
+            row = frame % self.frames * PHASE_COUNT
+            rows.append(self.times[row:row + PHASE_COUNT].tolist())
+        return rows
+
+    def summary(self):
+        """
+        Summarize the buffered frames
+
+        Returns a dict with 'frames', 'fps', the 'p50', 'p95' and 'p99' frame times, the mean
+        'busy' time (everything but waiting) and 'phases', the mean time of each phase.
+        Times are in milliseconds.
+        """
+        rows = self.rows()
+        totals = sorted(sum(row) for row in rows)
+        count = len(rows)
+        elapsed = sum(totals)
+        phases = [sum(column) / count * 1000 if count else 0.0 for column in zip(*rows)]
+        if not phases:
+            phases = [0.0] * PHASE_COUNT
+        return {
+            'frames': count,
+            'fps': count / elapsed if elapsed else 0.0,
+            'p50': percentile(totals, 0.50) * 1000,
+            'p95': percentile(totals, 0.95) * 1000,
+            'p99': percentile(totals, 0.99) * 1000,
+            'busy': sum(phases) - phases[PHASE_WAIT],
+            'phases': dict(zip(PHASE_NAMES, phases)),
+        }
+
+    def report(self):
+        """One line summary of the buffered frames"""
+        summary = self.summary()
+        return (f"Profiler: {summary['frames']} frames, {summary['fps']:.1f} fps, frame time "
+                f"p50 {summary['p50']:.2f} ms, p95 {summary['p95']:.2f} ms, p99 {summary['p99']:.2f} ms, "
+                f"busy {summary['busy']:.2f} ms")
+
+    def write(self, path):
+        """Write the buffered frames as CSV, one row per frame with each phase in milliseconds"""
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(('frame',) + PHASE_NAMES + ('total',))
+            rows = self.rows()
+            for frame, row in enumerate(rows, self.frame - len(rows)):
+                writer.writerow([frame] + [round(seconds * 1000, 4) for seconds in row] + [round(sum(row) * 1000, 4)])
+
+
+class TracingProfiler(FrameProfiler):
+    """
+    FrameProfiler that also writes every phase and span to a Chrome trace_event JSON file
+
+    Each frame is a 'frame' span with its phases nested inside. Spans are stored as tuples and
+    handed over in batches to a writer thread, which turns them into JSON off the game loop.
+    The writer's own work shows up as spans on a second thread in the trace.
+    Call close() at the end to flush everything and finish the file.
+    """
+
+    def __init__(self, path, frames=PROFILE_FRAMES, batch_frames=TRACE_BATCH_FRAMES):
+        super().__init__(frames)
+        self.path = path
+        self.batch_frames = batch_frames
+        self.origin = self.frame_start = self.last  # Trace timestamps count from here
+        self.events = []  # (name, category, start, end, args) of the batch being collected
+        self.batches = queue.Queue(maxsize=TRACE_QUEUE_BATCHES)
+        self.dropped_batches = 0
+        self.written_events = 0
+
+        self.file = open(path, 'w')
+        self.file.write('{"displayTimeUnit": "ms", "traceEvents": [\n')
+        self.write_event({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': 1, 'args': {'name': 'game loop'}})
+        self.write_event({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': 2, 'args': {'name': 'trace writer'}})
+        self.writer = threading.Thread(target=self.write_batches, name='trace writer', daemon=True)
+        self.writer.start()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.times[self.row + phase] += now - self.last
+        self.events.append((PHASE_NAMES[phase], 'phase', self.last, now, None))
+        self.last = now
+
+    def span(self, name, start, **args):
+        self.events.append((name, 'span', start, time.perf_counter(), args))
+
+    def end_frame(self):
+        self.events.append(('frame', 'frame', self.frame_start, self.last, {'frame': self.frame}))
+        self.frame_start = self.last
+        super().end_frame()
+        if self.frame % self.batch_frames == 0:
+            self.flush()
+
+    def flush(self):
+        """Hand the spans collected so far to the writer thread (dropped if it is too far behind)"""
+        if not self.events:
+            return
+        try:
+            self.batches.put_nowait(self.events)
+        except queue.Full:
+            self.dropped_batches += 1
+        self.events = []
+
+    def write_event(self, event):
+        separator = ',\n' if self.written_events else ''
+        self.file.write(separator + json.dumps(event, separators=(',', ':')))
+        self.written_events += 1
+
+    def write_batches(self):
+        """Writer thread: turn batches of spans into trace events until close() sends None"""
+        origin = self.origin
+        while True:
+            batch = self.batches.get()
+            if batch is None:
+                return
+            start = time.perf_counter()
+            # Formatted by hand (names and categories are plain identifiers), json.dumps is only
+            # needed for the args and is a lot slower per event
+            lines = []
+            for name, category, begin, end, args in batch:
+                line = (f'{{"name":"{name}","cat":"{category}","ph":"X","pid":1,"tid":1,'
+                        f'"ts":{(begin - origin) * 1e6:.3f},"dur":{(end - begin) * 1e6:.3f}')
+                if args:
+                    line += f',"args":{json.dumps(args)}'
+                lines.append(line + '}')
+            self.file.write(',\n' + ',\n'.join(lines))
+            self.written_events += len(lines)
+            end = time.perf_counter()
+            self.write_event({'name': 'write_batch', 'cat': 'trace', 'ph': 'X', 'pid': 1, 'tid': 2,
+                              'ts': round((start - origin) * 1e6, 3), 'dur': round((end - start) * 1e6, 3),
+                              'args': {'events': len(batch)}})
+
+    def close(self):
+        """Flush the remaining spans, wait for the writer and finish the file"""
+        self.flush()
+        self.batches.put(None)
+        self.writer.join()
+        self.file.write('\n]}\n')
+        self.file.close()
+
+    def report(self):
+        text = f'{super().report()}\nTrace: {self.written_events} events written to {self.path}'
+        if self.dropped_batches:
+            text += f', {self.dropped_batches} batches dropped (the writer fell behind)'
+        return text
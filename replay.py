@@ -0,0 +1,184 @@
+import argparse
+import struct
+import sys
+import time
+
+from simulation import (ACTION_UP, ACTION_DOWN, ACTION_LEFT, ACTION_RIGHT,
+                        DEATH_RIVER, DEATH_CAR, DEATH_FELL, LaneManager, World)
+
+# This file records and plays back games. A replay is the world seed plus every hop the player
+# made, tagged with the tick it was applied on. Since the simulation is deterministic for a seed,
+# that is enough to re-simulate the whole game.
+#
+# File layout (all counts and ticks are unsigned LEB128 varints):
+#   b'CRRP', version byte, seed (signed 64-bit little endian, see SEED_MIN and SEED_MAX),
+#   final tick, final score, death cause byte, number of hops,
+#   then one varint per hop: (ticks since the previous hop << 2) | move
+# A hop normally takes a single byte.
+#
+# Run "python replay.py FILE" to re-simulate a replay headless and check its recorded result.
+
+MAGIC = b'CRRP'
+VERSION = 3  # Older replays were recorded before lanes drew their spawns ahead (v1) or warmed up (v2)
+
+# Moves are stored in 2 bits
+MOVE_CODES = {ACTION_UP: 0, ACTION_DOWN: 1, ACTION_LEFT: 2, ACTION_RIGHT: 3}
+CODE_MOVES = {code: action for action, code in MOVE_CODES.items()}
+
+# Death causes are stored in 1 byte (0 = still alive when the recording stopped)
+DEATH_CODES = {None: 0, DEATH_RIVER: 1, DEATH_CAR: 2, DEATH_FELL: 3}
+CODE_DEATHS = {code: cause for cause, code in DEATH_CODES.items()}
+
+# The seed is stored as a signed 64-bit integer, so only seeds in this range can be recorded
+SEED_MIN = -2 ** 63
+SEED_MAX = 2 ** 63 - 1
+
+
+def write_varint(out, value):
+    """Append value as an unsigned LEB128 varint to the bytearray out"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    """Read an unsigned LEB128 varint from data at pos, returns (value, new pos)"""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    """A recorded game: the seed, the hops by tick, and how the game ended"""
+
+    def __init__(self, seed, events=None, ticks=0, score=0, death_cause=None):
+        self.seed = seed
+        self.events = events if events is not None else []  # (tick, action) in tick order
+        self.ticks = ticks  # Ticks simulated when the recording stopped
+        self.score = score
+        self.death_cause = death_cause
+
+    def record(self, tick, action):
+        """Record a hop applied at the start of the given tick"""
+        self.events.append((tick, action))
+
+    def finish(self, world):
+        """Store how the recorded world ended up"""
+        self.ticks = world.ticks
+        self.score = world.player.score
+        self.death_cause = world.death_cause
+
+    def to_bytes(self):
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        out += struct.pack('<q', self.seed)
+        write_varint(out, self.ticks)
+        write_varint(out, self.score)
+        out.append(DEATH_CODES[self.death_cause])
+        write_varint(out, len(self.events))
+        last_tick = 0
+        for tick, action in self.events:
+            write_varint(out, (tick - last_tick) << 2 | MOVE_CODES[action])
+            last_tick = tick
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != MAGIC:
+            raise ValueError('Not a Crossy Road replay')
+        try:
+            if data[4] != VERSION:
+                raise ValueError(f'Unsupported replay version {data[4]}')
+            seed, = struct.unpack_from('<q', data, 5)
+            pos = 13
+            ticks, pos = read_varint(data, pos)
+            score, pos = read_varint(data, pos)
+            death_cause = CODE_DEATHS[data[pos]]
+            count, pos = read_varint(data, pos + 1)
+            events = []
+            tick = 0
+            for _ in range(count):
+                value, pos = read_varint(data, pos)
+                tick += value >> 2
+                events.append((tick, CODE_MOVES[value & 3]))
+        except (IndexError, struct.error):
+            raise ValueError('truncated replay') from None
+        return cls(seed, events, ticks, score, death_cause)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayPlayback:
+    """Feeds a replay's hops back tick by tick"""
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.index = 0
+
+    def actions_for(self, tick):
+        """Get the hops recorded for the given tick (ticks must be asked for in order)"""
+        events = self.replay.events
+        actions = []
+        while self.index < len(events) and events[self.index][0] <= tick:
+            actions.append(events[self.index][1])
+            self.index += 1
+        return actions
+
+    def finished(self, world):
+        """Check if the world has reached the end of the recording"""
+        return world.done or world.ticks >= self.replay.ticks
+
+
+def play(replay, lane_manager_class=LaneManager):
+    """Re-simulate a replay headless as fast as possible, returns the final World"""
+    world = World(lane_manager_class=lane_manager_class, seed=replay.seed)
+    playback = ReplayPlayback(replay)
+    while not playback.finished(world):
+        for action in playback.actions_for(world.ticks):
+            world.apply_action(action)
+        world.step()
+    return world
+
+
+def verify(replay, lane_manager_class=LaneManager):
+    """Re-simulate a replay headless, returns (matches the recorded result, final World)"""
+    world = play(replay, lane_manager_class)
+    ok = (world.ticks == replay.ticks and world.player.score == replay.score
+          and world.death_cause == replay.death_cause)
+    return ok, world
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-simulate a Crossy Road replay headless and check its result')
+    parser.add_argument('replay', help='replay file recorded with main.py --record')
+    args = parser.parse_args(argv)
+
+    replay = Replay.load(args.replay)
+    start = time.perf_counter()
+    ok, world = verify(replay)
+    elapsed = time.perf_counter() - start
+
+    print(f'Seed {replay.seed}, {len(replay.events)} hops, {world.ticks} ticks in {elapsed:.3f}s '
+          f'({world.ticks / max(elapsed, 1e-9):.0f} ticks/s)')
+    print(f'Recorded: score {replay.score}, death {replay.death_cause} at tick {replay.ticks}')
+    print(f'Replayed: score {world.player.score}, death {world.death_cause} at tick {world.ticks}')
+    print('OK' if ok else 'MISMATCH')
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1120 @@
+import random
+import math
+import threading
+import time
+from collections import deque
+
+from profiler import PHASE_CAMERA, PHASE_PLAYER, PHASE_LANES, PHASE_CHECKS
+
+# This file contains the headless game logic (world state, lanes, cars, logs and the player).
+# It never imports pygame, so it can be used on servers and test machines without a display.
+# main.py layers the pygame drawing code on top of these classes.
+
+# Constants
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+TILE_SIZE = 40
+FPS = 60  # Simulation ticks per second, all speeds below are in pixels per tick
+TICK_SECONDS = 1.0 / FPS
+
+# Lane types
+LANE_GRASS = 'GRASS'
+LANE_ROAD = 'ROAD'
+LANE_RIVER = 'RIVER'
+
+# Player actions (shared by the keyboard, replays and agents)
+ACTION_NONE = 0
+ACTION_UP = 1
+ACTION_DOWN = 2
+ACTION_LEFT = 3
+ACTION_RIGHT = 4
+
+# Tile offsets (dx, dy) for each action
+ACTION_MOVES = {
+    ACTION_NONE: (0, 0),
+    ACTION_UP: (0, -1),  # Negative Y = move up
+    ACTION_DOWN: (0, 1),
+    ACTION_LEFT: (-1, 0),
+    ACTION_RIGHT: (1, 0),
+}
+
+# How far ahead (in ticks) next_safe_window looks by default
+SAFE_WINDOW_HORIZON = FPS * 10
+
+# How many upcoming spawns each road/river lane keeps drawn ahead of time
+SPAWN_SCHEDULE_LENGTH = 8
+
+# New lanes start out as if they had been running this many ticks already, so their traffic is in
+# full flow when they scroll into view (long enough for the slowest log to cross the screen)
+LANE_WARMUP_TICKS = SCREEN_WIDTH + TILE_SIZE * 3
+
+# How far above the top of the screen lanes are simulated every tick (LaneManager.active_margin);
+# lanes outside the active window are frozen and fast-forwarded when they are next needed
+ACTIVE_MARGIN = TILE_SIZE * 6
+
+# Lanes a game starts with around the player, the bottom START_GRASS_LANES of them always grass
+START_LANES = 30
+START_GRASS_LANES = 5
+
+# Lanes kept built ahead of time in LaneManager.lookahead (see pregenerate), so even a quick run of
+# hops only has to pop ready lanes, and the default budget of one pregenerate call
+LOOKAHEAD_LANES = 20
+LANE_BUDGET_LANES = 2
+LANE_BUDGET_SECONDS = 0.0005
+
+# Causes of death reported by World.step
+DEATH_RIVER = 'river'  # Drowned or carried off screen by a log
+DEATH_CAR = 'car'  # Hit by a car
+DEATH_FELL = 'fell'  # Fell off the bottom of the screen
+
+
+def lerp(a, b, alpha):
+    """Blend from a (alpha 0) to b (alpha 1), exact at both ends"""
+    return a * (1 - alpha) + b * alpha
+
+
+def overlap_ticks(x, velocity, width, tick, left, right):
+    """
+    Get the ticks during which an obstacle overlaps the span left..right, as (start, stop)
+
+    The obstacle is width wide, at x on the given tick and moves velocity pixels per tick, so its
+    position on tick t is x + velocity * (t - tick). stop is exclusive, start may be before tick.
+    """
+    # Overlapping (like colliderect) while left - width < x + velocity * (t - tick) < right
+    low = (left - width - x) / velocity
+    high = (right - x) / velocity
+    if velocity < 0:
+        low, high = high, low
+    return tick + math.floor(low) + 1, tick + math.ceil(high)
+
+
+def safe_windows(lane_type, motion, left, right, start, stop):
+    """
+    Get the windows of ticks in start..stop when a player spanning left..right is safe in a lane
+
+    motion is a list of (x, velocity, width, tick) for the lane's cars or logs (see
+    Lane.get_obstacle_motion). Roads are safe while no car overlaps the span, rivers while a log
+    does, grass always. Returns sorted, non-overlapping (start, stop) pairs, stop exclusive.
+    """
+    if lane_type not in (LANE_ROAD, LANE_RIVER):
+        return [(start, stop)]
+
+    # Merge the ticks covered by any obstacle into sorted, separate windows
+    covered = []
+    for first, last in sorted(overlap_ticks(x, velocity, width, tick, left, right)
+                              for x, velocity, width, tick in motion):
+        first = max(first, start)
+        last = min(last, stop)
+        if first >= last:
+            continue
+        if covered and first <= covered[-1][1]:
+            covered[-1] = (covered[-1][0], max(covered[-1][1], last))
+        else:
+            covered.append((first, last))
+
+    if lane_type == LANE_RIVER:
+        return covered
+
+    # Roads: safe in the gaps between cars
+    windows = []
+    for first, last in covered:
+        if start < first:
+            windows.append((start, first))
+        start = last
+    if start < stop:
+        windows.append((start, stop))
+    return windows
+
+
+class Rect:
+    """Minimal axis-aligned rectangle with the same collision rules as pygame.Rect"""
+
+    __slots__ = ('x', 'y', 'width', 'height')
+
+    def __init__(self, x, y, width, height):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    def colliderect(self, other):
+        """Check if two rectangles overlap (touching edges do not count)"""
+        return (self.width > 0 and self.height > 0 and other.width > 0 and other.height > 0
+                and self.x < other.x + other.width and other.x < self.x + self.width
+                and self.y < other.y + other.height and other.y < self.y + self.height)
+
+
+class ObjectPool:
+    """
+    Free lists of cars, logs and lanes that left the game, so they can be reused instead of allocated
+
+    Instances are kept per class (the pygame front end uses its own subclasses) and brought back
+    with their reset method, which takes the same arguments as __init__. created and reused count
+    instances per class name: once the game runs steadily, created should stop growing.
+    """
+
+    def __init__(self):
+        self.free = {}  # Class -> released instances
+        self.created = {}
+        self.reused = {}
+
+    def acquire(self, cls, *args):
+        """Get an instance of cls set up with args, recycled if one is free"""
+        free = self.free.get(cls)
+        if free:
+            instance = free.pop()
+            instance.reset(*args)
+            counts = self.reused
+        else:
+            instance = cls(*args)
+            counts = self.created
+        counts[cls.__name__] = counts.get(cls.__name__, 0) + 1
+        return instance
+
+    def release(self, instance):
+        """Hand back an instance nothing uses anymore"""
+        self.free.setdefault(type(instance), []).append(instance)
+
+    def absorb(self, other):
+        """Move the free instances and counts of another pool into this one (other is left empty)"""
+        for cls, instances in other.free.items():
+            self.free.setdefault(cls, []).extend(instances)
+        for counts, other_counts in ((self.created, other.created), (self.reused, other.reused)):
+            for name, count in other_counts.items():
+                counts[name] = counts.get(name, 0) + count
+            other_counts.clear()
+        other.free.clear()
+
+    def stats(self):
+        """Get {class name: (created, reused, free now)}"""
+        free = {cls.__name__: len(instances) for cls, instances in self.free.items()}
+        return {name: (self.created.get(name, 0), self.reused.get(name, 0), free.get(name, 0))
+                for name in sorted(set(self.created) | set(self.reused))}
+
+
+class LaneRandom(random.Random):
+    """random.Random that ObjectPool can recycle: reset reseeds it"""
+
+    reset = random.Random.seed
+
+
+class Car:
+    # Fixed attributes instead of a __dict__: there are lots of these and they come and go all game
+    __slots__ = ('x', 'y', 'speed', 'direction', 'rect', 'prev_x', 'spawn_x', 'spawn_tick')
+
+    width = TILE_SIZE * 2  # Cars are 2 tiles wide
+    height = TILE_SIZE - 4  # Slightly smaller than lane height
+
+    def __init__(self, x, y, speed, direction):
+        self.rect = Rect(x, y, self.width, self.height)
+        self.reset(x, y, speed, direction)
+
+    def reset(self, x, y, speed, direction):
+        """Set the car up as if it was just created (see ObjectPool)"""
+        self.x = x
+        self.y = y
+        self.speed = speed
+        self.direction = direction  # 1 for right, -1 for left
+        self.rect.x = x
+        self.rect.y = y
+        self.prev_x = x  # Position at the start of the last tick (for render interpolation)
+        # Where and on which lane tick it spawned: it moves in a straight line from there
+        self.spawn_x = x
+        self.spawn_tick = 0
+
+    def x_at(self, tick):
+        """Get the x position on a given lane tick (past or future) without stepping"""
+        return self.spawn_x + self.speed * self.direction * (tick - self.spawn_tick)
+
+    def update(self):
+        """Move the car horizontally"""
+        self.prev_x = self.x
+        self.x += self.speed * self.direction
+        self.rect.x = self.x
+
+        # Check if car is off screen
+        if self.direction > 0:  # Moving right
+            return self.x > SCREEN_WIDTH
+        else:  # Moving left
+            return self.x + self.width < 0
+
+    def move_down(self, dy):
+        """Move car down (for camera scrolling)"""
+        self.y += dy
+        self.rect.y = self.y
+
+
+class Log:
+    __slots__ = ('x', 'y', 'speed', 'direction', 'rect', 'prev_x', 'spawn_x', 'spawn_tick')
+
+    width = TILE_SIZE * 3  # Logs are 3 tiles wide (larger than cars)
+    height = TILE_SIZE - 4  # Slightly smaller than lane height
+
+    def __init__(self, x, y, speed, direction):
+        self.rect = Rect(x, y, self.width, self.height)
+        self.reset(x, y, speed, direction)
+
+    def reset(self, x, y, speed, direction):
+        """Set the log up as if it was just created (see ObjectPool)"""
+        self.x = x
+        self.y = y
+        self.speed = speed
+        self.direction = direction  # 1 for right, -1 for left
+        self.rect.x = x
+        self.rect.y = y
+        self.prev_x = x  # Position at the start of the last tick (for render interpolation)
+        # Where and on which lane tick it spawned: it moves in a straight line from there
+        self.spawn_x = x
+        self.spawn_tick = 0
+
+    def x_at(self, tick):
+        """Get the x position on a given lane tick (past or future) without stepping"""
+        return self.spawn_x + self.speed * self.direction * (tick - self.spawn_tick)
+
+    def update(self):
+        """Move the log horizontally"""
+        self.prev_x = self.x
+        self.x += self.speed * self.direction
+        self.rect.x = self.x
+
+        # Check if log is off screen
+        if self.direction > 0:  # Moving right
+            return self.x > SCREEN_WIDTH
+        else:  # Moving left
+            return self.x + self.width < 0
+
+    def move_down(self, dy):
+        """Move log down (for camera scrolling)"""
+        self.y += dy
+        self.rect.y = self.y
+
+
+class Lane:
+    # Classes used for spawned obstacles (the pygame front end swaps in drawable subclasses)
+    car_class = Car
+    log_class = Log
+
+    __slots__ = ('rect', 'type', 'rng', 'pool', 'cars', 'logs', 'ticks', 'spawn_schedule',
+                 'car_speed', 'car_direction', 'min_car_spacing',
+                 'log_speed', 'log_direction', 'min_log_spacing', 'spawn_chance', 'spawn_delay')
+
+    def __init__(self, y, lane_type, rng=None, pool=None):
+        self.rect = Rect(0, y, SCREEN_WIDTH, TILE_SIZE)
+        self.cars = []
+        self.logs = []
+        self.spawn_schedule = deque()  # Lane ticks of the next spawns, drawn ahead (see get_spawn_schedule)
+        self.reset(y, lane_type, rng, pool)
+
+    def reset(self, y, lane_type, rng=None, pool=None):
+        """Set the lane up as if it was just created (see ObjectPool), its cars/logs must be released first"""
+        self.rect.y = y
+        self.type = lane_type  # 'GRASS', 'ROAD', or 'RIVER'
+        # Random stream for this lane's settings and spawns (see LaneManager.lane_rng)
+        self.rng = rng if rng is not None else random.Random()
+        rng = self.rng
+        # Where spawned cars/logs come from and culled ones go (LaneManager shares one between lanes)
+        self.pool = pool if pool is not None else ObjectPool()
+        self.ticks = 0  # Updates so far (LaneManager.add_lane syncs it with the manager's tick count)
+        self.spawn_schedule.clear()
+
+        if self.type == LANE_ROAD:
+            # Road lanes have cars with random speed and direction
+            self.car_speed = rng.randint(2, 5)
+            self.car_direction = rng.choice([-1, 1])  # -1 left, 1 right
+            # Random spawn chance per frame (lower = more frequent)
+            self.spawn_chance = rng.uniform(0.01, 0.03)  # 1-3% chance per frame
+            self.min_car_spacing = rng.randint(200, 400)  # Much larger spacing: 200-400 pixels (5-10 tiles)
+            # Ticks after a spawn until that car is min_car_spacing into the screen (see get_spawn_schedule)
+            self.spawn_delay = -(-(self.min_car_spacing + self.car_class.width) // self.car_speed)
+        elif self.type == LANE_RIVER:
+            # River lanes have logs with slower speeds
+            self.log_speed = rng.randint(1, 3)  # Slower than cars
+            self.log_direction = rng.choice([-1, 1])  # -1 left, 1 right
+            # Random spawn chance per frame
+            self.spawn_chance = rng.uniform(0.01, 0.025)  # 1-2.5% chance per frame
+            self.min_log_spacing = rng.randint(150, 300)  # Spacing between logs
+            self.spawn_delay = -(-(self.min_log_spacing + self.log_class.width) // self.log_speed)
+
+    def get_spawn_x(self):
+        """Get the x new cars/logs spawn at: just off the edge of the screen they drive in from"""
+        if self.type == LANE_ROAD:
+            return -self.car_class.width if self.car_direction > 0 else SCREEN_WIDTH
+        return -self.log_class.width if self.log_direction > 0 else SCREEN_WIDTH
+
+    def spawn_car(self):
+        """Spawn a new car at the edge of the screen"""
+        # Moving right spawns on the left, moving left on the right
+        car = self.pool.acquire(self.car_class, self.get_spawn_x(), self.rect.y + 2, self.car_speed, self.car_direction)
+        car.spawn_tick = self.ticks
+        self.cars.append(car)
+
+    def spawn_log(self):
+        """Spawn a new log at the edge of the screen"""
+        log = self.pool.acquire(self.log_class, self.get_spawn_x(), self.rect.y + 2, self.log_speed, self.log_direction)
+        log.spawn_tick = self.ticks
+        self.logs.append(log)
+
+    def spawn_gap(self):
+        """Draw how many ticks pass before the next spawn once there is room for one"""
+        # Spawning used to be a spawn_chance roll on every tick with room to spawn: the number of
+        # failed rolls before the first success is geometric, so one draw gives the same distribution
+        return int(math.log1p(-self.rng.random()) / math.log1p(-self.spawn_chance))
+
+    def get_spawn_schedule(self, tick=None):
+        """
+        Get the lane ticks of the next SPAWN_SCHEDULE_LENGTH spawns, drawing more as needed
+
+        A new car/log has room to spawn once the previous one is min_car_spacing/min_log_spacing
+        into the screen. It spawns just off the edge (see get_spawn_x) and moves at a fixed speed,
+        so that is spawn_delay = ceil((spacing + width) / speed) ticks after it spawned, known as
+        soon as it does. tick is the lane tick to start from if nothing is scheduled yet (default:
+        this lane's own tick count).
+        """
+        schedule = self.spawn_schedule
+        if not schedule:
+            # Nothing spawned yet: there is room from the start
+            schedule.append((self.ticks if tick is None else tick) + self.spawn_gap())
+        while len(schedule) < SPAWN_SCHEDULE_LENGTH:
+            schedule.append(schedule[-1] + self.spawn_delay + self.spawn_gap())
+        return schedule
+
+    def update(self):
+        """Update cars/logs in this lane"""
+        if self.type == LANE_ROAD:
+            # Spawn a car when its scheduled tick comes up
+            if self.get_spawn_schedule()[0] == self.ticks:
+                self.spawn_schedule.popleft()
+                self.spawn_car()
+
+            # Update all cars and remove those off screen
+            cars_to_remove = []
+            for car in self.cars:
+                if car.update():  # Returns True if off screen
+                    cars_to_remove.append(car)
+
+            for car in cars_to_remove:
+                self.cars.remove(car)
+                self.pool.release(car)
+
+        elif self.type == LANE_RIVER:
+            # Spawn a log when its scheduled tick comes up
+            if self.get_spawn_schedule()[0] == self.ticks:
+                self.spawn_schedule.popleft()
+                self.spawn_log()
+
+            # Update all logs and remove those off screen
+            logs_to_remove = []
+            for log in self.logs:
+                if log.update():  # Returns True if off screen
+                    logs_to_remove.append(log)
+
+            for log in logs_to_remove:
+                self.logs.remove(log)
+                self.pool.release(log)
+
+        self.ticks += 1
+
+    def fast_forward(self, tick):
+        """
+        Bring the lane from its own tick count up to tick in closed form
+
+        Ends up exactly where calling update() that many times would: cars/logs move in straight
+        lines, so each one's position is worked out directly, and the ones that would have spawned
+        and left the screen in between are never created at all.
+        """
+        ticks = tick - self.ticks
+        if ticks <= 0:
+            return
+        if self.type == LANE_ROAD:
+            obstacles, spawn, width = self.cars, self.spawn_car, self.car_class.width
+            velocity = self.car_speed * self.car_direction
+        elif self.type == LANE_RIVER:
+            obstacles, spawn, width = self.logs, self.spawn_log, self.log_class.width
+            velocity = self.log_speed * self.log_direction
+        else:
+            self.ticks = tick
+            return
+
+        def gone(x):
+            # Off the far edge of the screen, where Car.update / Log.update report it
+            return x > SCREEN_WIDTH if velocity > 0 else x + width < 0
+
+        # Move (and cull) what is already in the lane
+        remaining = []
+        for obstacle in obstacles:
+            x = obstacle.x + velocity * ticks
+            if gone(x):
+                self.pool.release(obstacle)
+                continue
+            obstacle.prev_x = x - velocity
+            obstacle.x = x
+            obstacle.rect.x = x
+            remaining.append(obstacle)
+        obstacles[:] = remaining
+
+        # Spawns that were due in between, placed where they are by now
+        spawn_x = self.get_spawn_x()
+        schedule = self.get_spawn_schedule()
+        while schedule[0] < tick:
+            spawn_tick = schedule.popleft()
+            x = spawn_x + velocity * (tick - spawn_tick)
+            if not gone(x):
+                spawn()
+                obstacle = obstacles[-1]
+                obstacle.spawn_tick = spawn_tick
+                obstacle.prev_x = x - velocity
+                obstacle.x = x
+                obstacle.rect.x = x
+            self.get_spawn_schedule()
+        self.ticks = tick
+
+    def get_obstacle_motion(self, scheduled=False):
+        """
+        Get (x, velocity, width, tick) of every car or log: it is at x on that tick and moves in a straight line
+
+        With scheduled, the cars/logs of the upcoming scheduled spawns are included too (after the others).
+        """
+        motion = [(obstacle.spawn_x, obstacle.speed * obstacle.direction, obstacle.width, obstacle.spawn_tick)
+                  for obstacle in self.cars or self.logs]
+        if scheduled:
+            motion.extend(self.get_scheduled_motion())
+        return motion
+
+    def get_scheduled_motion(self, tick=None):
+        """Get (x, velocity, width, tick) of the cars/logs that will spawn on the scheduled ticks"""
+        if self.type == LANE_ROAD:
+            velocity, width = self.car_speed * self.car_direction, self.car_class.width
+        elif self.type == LANE_RIVER:
+            velocity, width = self.log_speed * self.log_direction, self.log_class.width
+        else:
+            return []
+        x = self.get_spawn_x()
+        return [(x, velocity, width, spawn_tick) for spawn_tick in self.get_spawn_schedule(tick)]
+
+    def get_safe_windows(self, x, start, stop, width=TILE_SIZE):
+        """
+        Get the windows of ticks in start..stop when a player at x (width wide) is safe here
+
+        Scheduled spawns are included, so the windows are exact up to the last scheduled spawn.
+        """
+        return safe_windows(self.type, self.get_obstacle_motion(scheduled=True), x, x + width, start, stop)
+
+    def is_cell_safe(self, col, tick):
+        """Check if grid cell col (TILE_SIZE wide) is safe to stand on at the given tick"""
+        return bool(self.get_safe_windows(col * TILE_SIZE, tick, tick + 1))
+
+    def next_safe_window(self, col, tick, horizon=SAFE_WINDOW_HORIZON):
+        """Get the first (start, stop) window from tick on when cell col is safe, None if none within horizon"""
+        windows = self.get_safe_windows(col * TILE_SIZE, tick, tick + horizon)
+        return windows[0] if windows else None
+
+    def release_obstacles(self):
+        """Hand every car and log in this lane back to the pool"""
+        for obstacle in self.cars:
+            self.pool.release(obstacle)
+        for obstacle in self.logs:
+            self.pool.release(obstacle)
+        self.cars.clear()
+        self.logs.clear()
+
+    def move_down(self, dy):
+        """Move lane down by dy pixels"""
+        self.rect.y += dy
+        # Also move all cars and logs in this lane
+        for car in self.cars:
+            car.move_down(dy)
+        for log in self.logs:
+            log.move_down(dy)
+
+
+class LaneManager:
+    # Class used for new lanes (the pygame front end swaps in a drawable subclass)
+    lane_class = Lane
+    # Pixels above the top of the screen where lanes are still updated every tick
+    active_margin = ACTIVE_MARGIN
+
+    def __init__(self, start_y=0, seed=None, pool=None, start_lanes=True):
+        # The seed fully determines the lanes: each lane gets its own random stream keyed by its row
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        # Culled lanes, cars and logs are recycled through this (World.reset hands it to the next game)
+        self.pool = pool if pool is not None else ObjectPool()
+        # Lanes from the bottom up: new ones are appended at the top, culled ones popped off the
+        # bottom, both O(1) without rebuilding anything
+        self.lanes = deque()
+        self.rows = {}  # Row index -> lane, kept in sync as lanes are generated and culled
+        self.lanes_changed = 0  # Bumped whenever a lane is added or culled (cheap change check)
+        self.start_y = start_y  # Row 0 is the lane the player starts on, rows go negative upward
+        self.camera_y = start_y - SCREEN_HEIGHT * 0.6  # Start camera so player is in lower part of screen
+        self.prev_camera_y = self.camera_y  # Camera at the start of the last tick (for render interpolation)
+        self.ticks = 0  # Lane updates so far (the clock used by the safety queries)
+        self.profiler = None  # Optional profiler.FrameProfiler, gets a span for each burst of new lanes
+
+        # Lanes built ahead of time but not in the game yet, bottom up. Building a lane only draws
+        # its settings (its clock starts in add_lane), so when it is built makes no difference
+        self.lookahead = deque()
+        self.built_lanes = 0  # Lanes built so far, the next one goes right above them
+        self.built_type = None  # Type drawn for the last lane built (the next lane's type depends on it)
+
+        # Lanes around the player's starting position (without start_lanes, add_start_lanes adds
+        # them later, after pregenerate has built them a few at a time)
+        if start_lanes:
+            self.add_start_lanes()
+
+    def lane_rng(self, row):
+        """Get the random stream for the lane at row (the same for a given seed and row, whatever else happens)"""
+        return self.pool.acquire(LaneRandom, f'{self.seed}:{row}')
+
+    def row_of(self, y):
+        """Get the row index of the lane containing world Y position y"""
+        return int((y - self.start_y) // TILE_SIZE)
+
+    def build_lane(self):
+        """Build the next lane up and put it at the end of the lookahead"""
+        count = self.built_lanes
+        y = self.start_y - count * TILE_SIZE  # Start at player Y and go up
+        rng = self.lane_rng(self.row_of(y))
+
+        # Choose lane type with rules: no river after road, no road after river
+        if count == 0:
+            lane_type = LANE_GRASS  # First lane is always grass
+        else:
+            lane_type = self.get_valid_lane_type(self.built_type, rng)
+        lane = self.pool.acquire(self.lane_class, y, lane_type, rng, self.pool)
+        self.built_type = lane_type
+
+        # Make sure first lanes are grass for safe starting area (the type drawn above still
+        # decides what can follow)
+        if count < START_GRASS_LANES:
+            lane.type = LANE_GRASS
+
+        self.lookahead.append(lane)
+        self.built_lanes += 1
+
+    def next_lane(self):
+        """Take the next lane up out of the lookahead, building it now if it is empty"""
+        if not self.lookahead:
+            self.build_lane()
+        return self.lookahead.popleft()
+
+    def add_start_lanes(self):
+        """Add the lanes around the player's starting position (built now unless pregenerate got to them)"""
+        while len(self.lanes) < START_LANES:
+            self.add_lane(self.next_lane())
+
+    def pregenerate(self, lanes=LOOKAHEAD_LANES, max_lanes=LANE_BUDGET_LANES, seconds=LANE_BUDGET_SECONDS):
+        """
+        Build lanes ahead of time until the lookahead holds `lanes` of them, within a budget
+
+        At most max_lanes lanes are built (None = no limit) and no new one is started once
+        `seconds` have passed. Returns True once the lookahead is full.
+        """
+        start = time.perf_counter()
+        deadline = start + seconds
+        built = 0
+        while len(self.lookahead) < lanes:
+            if built == max_lanes or (built and time.perf_counter() >= deadline):
+                break
+            self.build_lane()
+            built += 1
+        if built and self.profiler is not None:
+            self.profiler.span('pregenerate_lanes', start, lanes=built)
+        return len(self.lookahead) >= lanes
+
+    def add_lane(self, lane):
+        """Add a lane on top of the existing ones and index it by row"""
+        # Its clock starts in the past, so it catches up to a lane full of traffic (see Lane.fast_forward)
+        lane.ticks = self.ticks - LANE_WARMUP_TICKS
+        self.lanes.append(lane)
+        self.rows[self.row_of(lane.rect.y)] = lane
+        self.lanes_changed += 1
+
+    def get_valid_lane_type(self, prev_lane_type, rng):
+        """Get a valid lane type that can follow the previous lane type, picked with rng"""
+        if prev_lane_type == LANE_ROAD:
+            # After road: can be grass or road (not river)
+            return rng.choice([LANE_GRASS, LANE_ROAD])
+        elif prev_lane_type == LANE_RIVER:
+            # After river: can be grass or river (not road)
+            return rng.choice([LANE_GRASS, LANE_RIVER])
+        else:  # prev_lane_type == 'GRASS'
+            # After grass: can be anything
+            return rng.choice([LANE_GRASS, LANE_ROAD, LANE_RIVER])
+
+    def update_camera(self, player_world_y):
+        """Update camera to follow player with a dead zone and smooth interpolation"""
+        # Dead zone - camera only moves if player is in upper 60% of screen
+        target_camera_y = player_world_y - SCREEN_HEIGHT * 0.6
+
+        # Smooth camera follow with lerp (linear interpolation)
+        # Instead of jumping instantly, smoothly move toward target
+        if self.camera_y > target_camera_y:
+            # Lerp factor: 0.1 = smooth, 0.5 = snappier, 1.0 = instant
+            lerp_factor = 0.15
+            self.camera_y += (target_camera_y - self.camera_y) * lerp_factor
+
+        # Add new lanes ahead of camera (upward direction, negative Y), ready built ones if
+        # pregenerate kept the lookahead filled
+        if self.lanes:
+            highest_lane_y = self.lanes[-1].rect.y
+        else:
+            highest_lane_y = self.start_y + TILE_SIZE
+
+        profiler = self.profiler
+        start = time.perf_counter() if profiler is not None else 0.0
+        generated = 0
+        while highest_lane_y > self.camera_y - SCREEN_HEIGHT:
+            new_lane = self.next_lane()
+            self.add_lane(new_lane)
+            highest_lane_y = new_lane.rect.y
+            generated += 1
+        if generated and profiler is not None:
+            profiler.span('generate_lanes', start, lanes=generated)
+
+        # Remove lanes that are far behind camera (lanes below the visible area)
+        # Since we're moving upward (negative Y), we want to keep lanes that are NOT too far below
+        # Keep lanes that are above camera_y (lower values) or within 2 screens below
+        # Lanes are ordered bottom to top, so the ones to remove are always at the bottom
+        cull_y = self.camera_y + SCREEN_HEIGHT * 2
+        lanes = self.lanes
+        while lanes and lanes[0].rect.y >= cull_y:
+            lane = lanes.popleft()
+            del self.rows[self.row_of(lane.rect.y)]
+            self.release_lane(lane)
+            self.lanes_changed += 1
+
+    def release_lane(self, lane):
+        """Hand a lane that left the game (and everything in it) back to the pool"""
+        lane.release_obstacles()
+        self.pool.release(lane.rng)
+        self.pool.release(lane)
+
+    def release_lanes(self):
+        """Hand every lane back to the pool, when this manager is done with (see World.reset)"""
+        for lane in self.lanes:
+            self.release_lane(lane)
+        for lane in self.lookahead:
+            self.release_lane(lane)
+        self.lanes.clear()
+        self.lookahead.clear()
+        self.rows.clear()
+        self.lanes_changed += 1
+
+    def get_active_rows(self):
+        """Get the range of rows updated every tick: the screen (plus a row below) and active_margin above it"""
+        return range(self.row_of(self.camera_y - self.active_margin),
+                     self.row_of(self.camera_y + SCREEN_HEIGHT + TILE_SIZE) + 1)
+
+    def update(self):
+        """Update the lanes in the active window (spawns and moves cars), the rest catch up when needed"""
+        rows = self.rows
+        for row in self.get_active_rows():
+            lane = rows.get(row)
+            if lane is not None:
+                self.sync_lane(lane)
+                lane.update()
+        self.ticks += 1
+
+    def sync_lane(self, lane):
+        """Fast-forward a lane that was left out of the updates to the current tick"""
+        if lane.ticks < self.ticks:
+            lane.fast_forward(self.ticks)
+
+    def warm_up(self):
+        """Fast-forward the lanes in the active window now instead of in the next update"""
+        for row in self.get_active_rows():
+            lane = self.rows.get(row)
+            if lane is not None:
+                self.sync_lane(lane)
+
+    def sync_lanes(self):
+        """Bring every lane's cars/logs up to date, including frozen ones (for drawing or debugging)"""
+        for lane in self.lanes:
+            self.sync_lane(lane)
+
+    def get_lane(self, row):
+        """Get the lane at row, up to date (None if there is none)"""
+        lane = self.rows.get(row)
+        if lane is not None:
+            self.sync_lane(lane)
+        return lane
+
+    def get_render_camera_y(self, alpha=1.0):
+        """Get the camera position blended between the last two ticks (alpha 0 = previous, 1 = current)"""
+        return lerp(self.prev_camera_y, self.camera_y, alpha)
+
+    def get_player_rows(self, player_rect):
+        """Get the range of rows the player's rect overlaps (usually just one)"""
+        return range(self.row_of(player_rect.y), self.row_of(player_rect.y + player_rect.height - 1) + 1)
+
+    def check_collision(self, player_rect):
+        """Check if player collides with any car (only the player's own row can hold one)"""
+        for row in self.get_player_rows(player_rect):
+            lane = self.get_lane(row)
+            if lane is not None and lane.type == LANE_ROAD:
+                for car in lane.cars:
+                    if player_rect.colliderect(car.rect):
+                        return True
+        return False
+
+    def get_obstacle_spans(self, row):
+        """Get (x, width) of every car or log in the lane at row, oldest first"""
+        lane = self.get_lane(row)
+        if lane is None:
+            return []
+        return [(obstacle.x, obstacle.width) for obstacle in lane.cars or lane.logs]
+
+    def get_obstacles_in_rows(self, rows):
+        """Get the rows, x positions and widths of every car and log in a range of rows (three lists)"""
+        obstacle_rows = []
+        xs = []
+        widths = []
+        for row in rows:
+            for x, width in self.get_obstacle_spans(row):
+                obstacle_rows.append(row)
+                xs.append(x)
+                widths.append(width)
+        return obstacle_rows, xs, widths
+
+    def get_obstacle_motion(self, row, scheduled=False):
+        """Get (x, velocity, width, tick) of every car or log in the lane at row (see Lane.get_obstacle_motion)"""
+        lane = self.get_lane(row)
+        return lane.get_obstacle_motion(scheduled) if lane is not None else []
+
+    def get_safe_windows(self, x, row, start, stop, width=TILE_SIZE):
+        """
+        Get the windows of ticks in start..stop when a player at x (width wide) is safe in row
+
+        Computed from the straight-line motion of the cars and logs already spawned and of the ones
+        scheduled to spawn (see Lane.get_spawn_schedule), so they are exact up to the last scheduled
+        spawn. Rows without a lane count as grass.
+        """
+        lane = self.rows.get(row)
+        if lane is None:
+            return [(start, stop)]
+        return safe_windows(lane.type, self.get_obstacle_motion(row, scheduled=True), x, x + width, start, stop)
+
+    def is_cell_safe(self, col, row, tick):
+        """Check if grid cell (col, row) is safe to stand on at the given tick"""
+        return bool(self.get_safe_windows(col * TILE_SIZE, row, tick, tick + 1))
+
+    def next_safe_window(self, col, row, tick=None, horizon=SAFE_WINDOW_HORIZON):
+        """Get the first (start, stop) window from tick (default now) when cell (col, row) is safe, or None"""
+        if tick is None:
+            tick = self.ticks
+        windows = self.get_safe_windows(col * TILE_SIZE, row, tick, tick + horizon)
+        return windows[0] if windows else None
+
+    def get_player_lane(self, player_y):
+        """Get the lane the player is currently on"""
+        return self.get_lane(self.row_of(player_y))
+
+    def handle_river_logic(self, player):
+        """Handle river physics: player must be on a log or drown"""
+        player_lane = self.get_player_lane(player.y)
+
+        if player_lane and player_lane.type == LANE_RIVER:
+            # Player is on a river - check if they're on a log
+            on_log = False
+
+            for log in player_lane.logs:
+                if player.rect.colliderect(log.rect):
+                    on_log = True
+                    # Move player with the log (parenting)
+                    player.x += log.speed * log.direction
+                    player.rect.x = player.x
+                    break
+
+            # If not on any log, player drowns
+            if not on_log:
+                return True  # Game over
+
+            # Check if player was pushed off screen by log
+            if player.x < 0 or player.x + player.size > SCREEN_WIDTH:
+                return True  # Game over
+
+        return False  # Player is safe
+
+
+class EveryLaneManager(LaneManager):
+    """
+    LaneManager that updates every lane it keeps on every tick, with no active window
+
+    Plays exactly the same games, only slower: the reference vectorized.check_shortcuts checks
+    the active window against, and bench.py times it against.
+    """
+
+    def get_active_rows(self):
+        rows = self.rows
+        return range(min(rows), max(rows) + 1) if rows else range(0)
+
+
+class Player:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y  # World Y position
+        self.size = TILE_SIZE
+        self.rect = Rect(self.x, self.y, self.size, self.size)
+        self.score = 0  # Track highest lane reached
+        self.highest_y = y  # Track highest Y position (lower/more negative values = further up)
+
+        # Hop animation properties
+        self.is_hopping = False
+        self.hop_progress = 0  # 0.0 to 1.0
+        self.hop_speed = 0.15  # How fast the hop completes (higher = faster)
+
+        # State at the start of the last tick (for render interpolation)
+        self.prev_x = x
+        self.prev_hop_progress = 0
+
+        # Facing direction: 'up', 'down', 'left', 'right'
+        self.facing = 'up'  # Default facing up
+
+    def move(self, dx, dy):
+        """Move player by dx, dy tiles in world space"""
+        new_x = self.x + dx * TILE_SIZE
+        new_y = self.y + dy * TILE_SIZE
+
+        # Update facing direction
+        if dx < 0:
+            self.facing = 'left'
+        elif dx > 0:
+            self.facing = 'right'
+        elif dy < 0:
+            self.facing = 'up'
+        elif dy > 0:
+            self.facing = 'down'
+
+        # Keep player within horizontal bounds
+        if dx != 0:  # Horizontal movement
+            if 0 <= new_x <= SCREEN_WIDTH - self.size:
+                self.x = new_x
+                self.rect.x = self.x
+                # Trigger hop animation
+                self.is_hopping = True
+                self.hop_progress = 0
+
+        # Vertical movement
+        if dy != 0:
+            self.y = new_y
+            self.rect.y = self.y
+            # Trigger hop animation
+            self.is_hopping = True
+            self.hop_progress = 0
+
+            if dy < 0:  # Moving up (negative Y in world space)
+                # Update score when moving up
+                if self.y < self.highest_y:
+                    self.highest_y = self.y
+                    self.score += 1
+
+    def update(self):
+        """Update hop animation"""
+        if self.is_hopping:
+            self.hop_progress += self.hop_speed
+            if self.hop_progress >= 1.0:
+                self.hop_progress = 1.0
+                self.is_hopping = False
+
+    def get_hop_offset(self, alpha=1.0):
+        """Calculate the vertical offset for the hop animation using sine wave
+
+        alpha blends between the hop progress of the last two ticks (0 = previous, 1 = current)
+        """
+        progress = lerp(self.prev_hop_progress, self.hop_progress, alpha)
+        if not self.is_hopping and progress >= self.hop_progress:
+            return 8  # Default voxel depth
+
+        # Use sine wave for smooth hop animation
+        # sin goes from 0 -> 1 -> 0 over the range 0 -> pi
+        hop_height = math.sin(progress * math.pi) * 12  # Max additional height of 12 pixels
+        return 8 + hop_height  # Base depth of 8 + animation offset
+
+    def get_render_x(self, alpha=1.0):
+        """Get the x position blended between the last two ticks (moves smoothly while riding a log)"""
+        return lerp(self.prev_x, self.x, alpha)
+
+    def get_screen_y(self, camera_y):
+        """Get player's Y position on screen based on camera"""
+        return self.y - camera_y
+
+    def reset(self, x, y):
+        """Reset player to starting position"""
+        self.x = x
+        self.y = y
+        self.rect.x = self.x
+        self.rect.y = self.y
+        self.score = 0
+        self.highest_y = y
+        self.is_hopping = False
+        self.hop_progress = 0
+        self.facing = 'up'
+        self.prev_x = x
+        self.prev_hop_progress = 0
+
+
+class World:
+    """One game of Crossy Road: the player, the lanes and the PLAYING-state update order"""
+
+    def __init__(self, lane_manager_class=LaneManager, player_class=Player, seed=None, profiler=None):
+        self.lane_manager_class = lane_manager_class
+        # Player starts in world space near the bottom of the screen
+        self.start_x = SCREEN_WIDTH // 2 - TILE_SIZE // 2
+        self.start_y = SCREEN_HEIGHT - TILE_SIZE * 3
+        self.player = player_class(self.start_x, self.start_y)
+        self.lane_manager = None
+        self.profiler = profiler  # Optional profiler.FrameProfiler, marks each part of step()
+        # Lanes of the next game, built ahead of time by prepare_in_background() for the seed it was asked for
+        self.next_lane_manager = None
+        self.next_seed = None
+        self.preparing = None  # Worker thread still building next_lane_manager (see prepare_in_background)
+        self.preparing_error = None  # What the worker raised, raised again by join_preparing
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Start a fresh game with a new set of lanes (a random seed if none is given)"""
+        # First, so the world is left as it was if the worker failed
+        self.join_preparing()
+        self.player.reset(self.start_x, self.start_y)
+        # The last game's lanes, cars and logs are recycled into the new one
+        pool = None
+        if self.lane_manager is not None:
+            self.lane_manager.release_lanes()
+            pool = self.lane_manager.pool
+
+        # Swap in the lanes prepare_in_background() built for this seed, if any
+        lane_manager = self.next_lane_manager
+        self.next_lane_manager = None
+        if lane_manager is not None and self.next_seed != seed:
+            # Built for another seed: recycled like the last game's
+            lane_manager.release_lanes()
+            if pool is None:
+                pool = lane_manager.pool
+            else:
+                pool.absorb(lane_manager.pool)
+            lane_manager = None
+        if lane_manager is None:
+            lane_manager = self.lane_manager_class(self.start_y, seed, pool=pool, start_lanes=False)
+        elif pool is not None and lane_manager.pool is not pool:
+            # Built on a worker thread with a pool of its own, which now takes over the old one
+            lane_manager.pool.absorb(pool)
+        lane_manager.profiler = self.profiler
+        lane_manager.add_start_lanes()
+        self.lane_manager = lane_manager
+        self.seed = self.lane_manager.seed
+        self.ticks = 0
+        self.death_cause = None
+
+    def prepare_in_background(self, seed=None):
+        """
+        Build the next game on a worker thread: all its lanes, with the traffic in view warmed up
+
+        The build is pure Python and shares the GIL, so it isn't free: it is spread over the
+        caller's next few frames and costs them about one world build in total (1-2 ms), instead
+        of one long stall in reset. reset(seed) swaps the result in, waiting for the thread if it
+        hasn't finished. Does nothing if seed is already prepared or being prepared.
+        """
+        if self.next_lane_manager is not None and self.next_seed == seed:
+            return
+        self.join_preparing()
+
+        # The pool isn't thread-safe, so the worker gets a pool of its own with everything free so
+        # far moved into it (reset hands it the rest), and nothing is marked on the profiler from it
+        pool = ObjectPool()
+        pool.absorb(self.lane_manager.pool)
+        if self.next_lane_manager is not None:
+            # Built for another seed
+            self.next_lane_manager.release_lanes()
+            pool.absorb(self.next_lane_manager.pool)
+        lane_manager = self.lane_manager_class(self.start_y, seed, pool=pool, start_lanes=False)
+        self.next_lane_manager = lane_manager
+        self.next_seed = seed
+        self.preparing = threading.Thread(target=self.build_lane_manager, args=(lane_manager,),
+                                          name='world pregeneration', daemon=True)
+        self.preparing.start()
+
+    def build_lane_manager(self, lane_manager):
+        """Worker thread of prepare_in_background: build the lanes and warm up the traffic in view"""
+        try:
+            lane_manager.pregenerate(START_LANES + LOOKAHEAD_LANES, None, math.inf)
+            lane_manager.add_start_lanes()
+            lane_manager.warm_up()
+        except Exception as error:
+            self.preparing_error = error
+
+    def join_preparing(self):
+        """
+        Wait for prepare_in_background's worker thread, if one is running
+
+        Raises whatever the worker raised, once. The half built lanes are dropped, but whatever
+        was free in their pool goes back to the current game's.
+        """
+        if self.preparing is not None:
+            self.preparing.join()
+            self.preparing = None
+        error = self.preparing_error
+        if error is not None:
+            self.preparing_error = None
+            self.lane_manager.pool.absorb(self.next_lane_manager.pool)
+            self.next_lane_manager = None
+            raise error
+
+    @property
+    def done(self):
+        return self.death_cause is not None
+
+    def move(self, dx, dy):
+        """Hop the player by dx, dy tiles (ignored once the game is over)"""
+        if not self.done:
+            self.player.move(dx, dy)
+
+    def apply_action(self, action):
+        """Hop the player according to one of the ACTION_* constants"""
+        if action != ACTION_NONE:
+            self.move(*ACTION_MOVES[action])
+
+    def step(self):
+        """Advance the game by one tick (1/FPS seconds), returns the cause of death or None"""
+        if self.done:
+            return self.death_cause
+
+        player = self.player
+        lane_manager = self.lane_manager
+        profiler = self.profiler
+
+        # Remember where things were so rendering can interpolate between ticks
+        # (taken after any hops, which are instant)
+        player.prev_x = player.x
+        player.prev_hop_progress = player.hop_progress
+        lane_manager.prev_camera_y = lane_manager.camera_y
+
+        # Update camera to follow player
+        lane_manager.update_camera(player.y)
+        if profiler is not None:
+            profiler.mark(PHASE_CAMERA)
+
+        # Update player animation
+        player.update()
+        if profiler is not None:
+            profiler.mark(PHASE_PLAYER)
+
+        # Update all lanes and cars
+        lane_manager.update()
+        self.ticks += 1
+        if profiler is not None:
+            profiler.mark(PHASE_LANES)
+
+        # Handle river logic (player must be on log or drown)
+        if lane_manager.handle_river_logic(player):
+            self.death_cause = DEATH_RIVER
+
+        # Check for collisions with cars
+        elif lane_manager.check_collision(player.rect):
+            self.death_cause = DEATH_CAR
+
+        # Check if player fell off the bottom of the screen
+        elif player.get_screen_y(lane_manager.camera_y) > SCREEN_HEIGHT:
+            self.death_cause = DEATH_FELL
+
+        if profiler is not None:
+            profiler.mark(PHASE_CHECKS)
+        return self.death_cause
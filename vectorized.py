@@ -0,0 +1,405 @@
+import time
+
+import numpy as np
+
+from simulation import (SCREEN_WIDTH, TILE_SIZE, LANE_ROAD, LANE_RIVER,
+                        LaneManager, EveryLaneManager, World)
+
+# This file contains an alternative lane engine that keeps every car and log in flat NumPy arrays
+# (struct-of-arrays) instead of Python Car/Log objects. Movement, culling and spawn checks for all
+# lanes in the active window happen in a handful of array operations per tick; lanes outside it
+# stay frozen in Lane objects and catch up when needed, like in the object engine.
+# Under the same random seed it produces exactly the same trajectories as the object engine.
+# With the couple dozen lanes the game keeps in its window it is still slower than the object
+# engine (NumPy's per-call overhead outweighs the few obstacles per lane), so nothing uses it to
+# go faster; it is kept as a second implementation to check the object engine against.
+# Run "python vectorized.py" to compare the two engines. It also checks that the object engine's
+# shortcuts (fast-forwarding frozen lanes, building the next game on a worker thread) don't change
+# the games either.
+
+
+# Per-lane arrays for the road and river lanes in the array window: (attribute, dtype)
+LANE_ARRAYS = (
+    ('lane_row', np.int64),
+    ('lane_y', float),
+    ('lane_speed', float),
+    ('lane_direction', float),
+    ('lane_width', float),
+    ('lane_spawn_x', float),
+    ('lane_is_road', bool),
+    ('lane_velocity', float),  # speed * direction
+    ('lane_edge', float),  # direction * x beyond which an obstacle is off screen
+    ('lane_next_spawn', np.int64),  # Tick of the lane's next scheduled spawn
+)
+
+
+class ArrayLaneManager(LaneManager):
+    """LaneManager whose obstacles in the active window live in contiguous NumPy arrays"""
+
+    def __init__(self, start_y=0, seed=None, pool=None, start_lanes=True, capacity=256):
+        super().__init__(start_y, seed, pool, start_lanes)
+
+        # Obstacle arrays (only the first self.count entries are alive, in spawn order)
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.direction = np.zeros(capacity)
+        self.velocity = np.zeros(capacity)  # speed * direction, added to x every tick
+        self.edge = np.zeros(capacity)  # Off screen once direction * x > edge
+        self.width = np.zeros(capacity)
+        self.row = np.zeros(capacity, dtype=np.int64)  # Lane row index (see LaneManager.row_of)
+        self.is_car = np.zeros(capacity, dtype=bool)  # True for cars, False for logs
+
+        # Rows whose traffic lives in the arrays: the lanes in the active window. The others keep
+        # theirs in Lane objects and catch up with Lane.fast_forward, like in the object engine
+        self.array_rows = range(0)
+        self.spawn_lanes = []  # Road and river lanes in array_rows, bottom up like self.lanes
+        for name, dtype in LANE_ARRAYS:
+            setattr(self, name, np.empty(0, dtype=dtype))
+        self._window_key = None  # (camera_y, lanes_changed) array_rows was last checked at
+
+    def _sync_window(self):
+        """
+        Move the traffic of lanes that left the active window back into their Lane objects, and
+        that of lanes that joined it into the arrays
+
+        The camera only moves up and lanes are only added on top, so lanes leave the window at the
+        bottom (a prefix of the lane arrays) and join it at the top (appended to them).
+        """
+        key = (self.camera_y, self.lanes_changed)
+        if key == self._window_key:
+            return
+        self._window_key = key
+
+        lanes = self.lanes
+        active = self.get_active_rows()
+        if lanes:
+            window = range(max(active.start, self.row_of(lanes[-1].rect.y)),
+                           min(active.stop, self.row_of(lanes[0].rect.y) + 1))
+        else:
+            window = range(0)
+        old = self.array_rows
+        if window == old:
+            return
+        self.array_rows = window
+
+        # Lanes that left: hand their obstacles back to them, frozen at this tick
+        leaving = {}
+        for row in old:
+            if row not in window:
+                lane = self.rows.get(row)
+                if lane is not None:
+                    lane.ticks = self.ticks
+                    if lane.type in (LANE_ROAD, LANE_RIVER):
+                        lane.release_obstacles()  # Copies left by sync_lanes, if any
+                        leaving[row] = lane
+        if leaving:
+            keep = (self.row[:self.count] >= window.start) & (self.row[:self.count] < window.stop)
+            self._restore_obstacles(leaving, np.flatnonzero(~keep))
+            self._compact(keep)
+            drop = len(leaving)
+            del self.spawn_lanes[:drop]
+            for name, _ in LANE_ARRAYS:
+                setattr(self, name, getattr(self, name)[drop:])
+
+        # Lanes that joined: catch them up like the object engine does and move their traffic in
+        joining = []
+        for row in reversed(window):
+            if row not in old:
+                lane = self.rows[row]
+                lane.fast_forward(self.ticks)
+                if lane.type in (LANE_ROAD, LANE_RIVER):
+                    is_road = lane.type == LANE_ROAD
+                    self._add_obstacles(lane.cars or lane.logs, row, is_road)
+                    lane.release_obstacles()
+                    joining.append((lane, row, is_road))
+        if joining:
+            self._append_lanes(joining)
+
+    def _append_lanes(self, joining):
+        """Append (lane, row, is_road) of road and river lanes to the lane arrays"""
+        values = []
+        for lane, row, is_road in joining:
+            if is_road:
+                speed, direction, width = lane.car_speed, lane.car_direction, TILE_SIZE * 2
+            else:
+                speed, direction, width = lane.log_speed, lane.log_direction, TILE_SIZE * 3
+            # Moving right: off screen once x > SCREEN_WIDTH, moving left: once -x > width
+            edge = SCREEN_WIDTH if direction > 0 else width
+            # The schedule lives on the lane, so it survives the lane leaving the window
+            next_spawn = lane.get_spawn_schedule()[0]
+            values.append((row, lane.rect.y + 2, speed, direction, width, lane.get_spawn_x(), is_road,
+                           speed * direction, edge, next_spawn))
+            self.spawn_lanes.append(lane)
+        for (name, dtype), column in zip(LANE_ARRAYS, zip(*values)):
+            setattr(self, name, np.concatenate((getattr(self, name), np.array(column, dtype=dtype))))
+
+    def _add_obstacles(self, obstacles, row, is_car):
+        """Append Car/Log objects of the lane at row to the arrays"""
+        n = self.count
+        end = n + len(obstacles)
+        if end > len(self.x):
+            self._grow(end)
+        for i, obstacle in enumerate(obstacles, n):
+            self.x[i] = obstacle.x
+            self.y[i] = obstacle.y
+            self.speed[i] = obstacle.speed
+            self.direction[i] = obstacle.direction
+            self.velocity[i] = obstacle.speed * obstacle.direction
+            self.edge[i] = SCREEN_WIDTH if obstacle.direction > 0 else obstacle.width
+            self.width[i] = obstacle.width
+            self.row[i] = row
+            self.is_car[i] = is_car
+        self.count = end
+
+    def _compact(self, keep):
+        """Keep only the alive obstacles selected by the boolean mask (preserves spawn order)"""
+        n = self.count
+        k = int(np.count_nonzero(keep))
+        for array in (self.x, self.y, self.speed, self.direction, self.velocity, self.edge,
+                      self.width, self.row, self.is_car):
+            array[:k] = array[:n][keep]
+        self.count = k
+
+    def _grow(self, needed):
+        """Make room for at least `needed` obstacles"""
+        capacity = max(needed, len(self.x) * 2)
+        for name in ('x', 'y', 'speed', 'direction', 'velocity', 'edge', 'width', 'row', 'is_car'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def update(self):
+        """Spawn, move and cull every obstacle in the active window at once"""
+        self._sync_window()
+
+        # Lanes whose scheduled spawn is due, taken from the lanes' own schedules like the object engine
+        spawn = (self.lane_next_spawn == self.ticks).nonzero()[0]
+
+        if len(spawn):
+            for i in spawn.tolist():
+                lane = self.spawn_lanes[i]
+                lane.spawn_schedule.popleft()
+                self.lane_next_spawn[i] = lane.get_spawn_schedule()[0]
+
+            n = self.count
+            end = n + len(spawn)
+            if end > len(self.x):
+                self._grow(end)
+            self.x[n:end] = self.lane_spawn_x[spawn]
+            self.y[n:end] = self.lane_y[spawn]
+            self.speed[n:end] = self.lane_speed[spawn]
+            self.direction[n:end] = self.lane_direction[spawn]
+            self.velocity[n:end] = self.lane_velocity[spawn]
+            self.edge[n:end] = self.lane_edge[spawn]
+            self.width[n:end] = self.lane_width[spawn]
+            self.row[n:end] = self.lane_row[spawn]
+            self.is_car[n:end] = self.lane_is_road[spawn]
+            self.count = end
+
+        # Move everything
+        n = self.count
+        x = self.x[:n]
+        x += self.velocity[:n]
+
+        # Cull obstacles that left the screen
+        off = self.direction[:n] * x > self.edge[:n]
+        if off.any():
+            self._compact(~off)
+
+        self.ticks += 1
+
+    def sync_lane(self, lane):
+        """Lanes in the arrays are moved every tick, the others are fast-forwarded like in the object engine"""
+        if self.row_of(lane.rect.y) not in self.array_rows:
+            super().sync_lane(lane)
+
+    def _in_arrays(self, rows):
+        """Check if every row in a range of rows has its traffic in the arrays"""
+        return self.array_rows.start <= rows.start and rows.stop <= self.array_rows.stop
+
+    def _overlapping(self, rect, rows):
+        """Indices of obstacles in a range of rows whose rects overlap the given rect, oldest first"""
+        # Only a handful of obstacles share a row, so those are checked one by one
+        row = self.row[:self.count]
+        if len(rows) == 1:
+            hits = (row == rows.start).nonzero()[0]
+        else:
+            hits = ((row >= rows.start) & (row < rows.stop)).nonzero()[0]
+        return [i for i, x, y, width in zip(hits.tolist(), self.x[hits].tolist(), self.y[hits].tolist(),
+                                             self.width[hits].tolist())
+                if rect.x < x + width and x < rect.x + rect.width
+                and rect.y < y + (TILE_SIZE - 4) and y < rect.y + rect.height]
+
+    def check_collision(self, player_rect):
+        """Check if player collides with any car in the player's rows"""
+        rows = self.get_player_rows(player_rect)
+        if not self._in_arrays(rows):
+            return super().check_collision(player_rect)
+        return any(self.is_car[i] for i in self._overlapping(player_rect, rows))
+
+    def handle_river_logic(self, player):
+        """Handle river physics: player must be on a log or drown"""
+        player_lane = self.get_player_lane(player.y)
+
+        if player_lane and player_lane.type == LANE_RIVER:
+            row = self.row_of(player_lane.rect.y)
+            if row not in self.array_rows:
+                return super().handle_river_logic(player)
+            logs = self._overlapping(player.rect, range(row, row + 1))
+
+            # If not on any log, player drowns
+            if not len(logs):
+                return True  # Game over
+
+            # Move player with the first (oldest) log it stands on (parenting)
+            log = logs[0]
+            player.x += self.speed[log] * self.direction[log]
+            player.rect.x = player.x
+
+            # Check if player was pushed off screen by log
+            if player.x < 0 or player.x + player.size > SCREEN_WIDTH:
+                return True  # Game over
+
+        return False  # Player is safe
+
+    def get_obstacle_spans(self, row):
+        """Get (x, width) of every car or log in the lane at row, oldest first"""
+        if row not in self.array_rows:
+            return super().get_obstacle_spans(row)
+        hits = np.flatnonzero(self.row[:self.count] == row)
+        return list(zip(self.x[hits].tolist(), self.width[hits].tolist()))
+
+    def get_obstacles_in_rows(self, rows):
+        """Get the rows, x positions and widths of every car and log in a range of rows (three arrays)"""
+        inside = range(max(rows.start, self.array_rows.start), min(rows.stop, self.array_rows.stop))
+        row = self.row[:self.count]
+        hits = np.flatnonzero((row >= inside.start) & (row < inside.stop))
+        found = row[hits], self.x[hits], self.width[hits]
+        outside = [r for r in rows if r not in inside]
+        if outside:
+            more = super().get_obstacles_in_rows(outside)
+            found = tuple(np.concatenate((a, np.array(b, dtype=a.dtype))) for a, b in zip(found, more))
+        return found
+
+    def get_obstacle_motion(self, row, scheduled=False):
+        """Get (x, velocity, width, tick) of every car or log in the lane at row, from their current position"""
+        if row not in self.array_rows:
+            return super().get_obstacle_motion(row, scheduled)
+        hits = np.flatnonzero(self.row[:self.count] == row)
+        motion = [(x, velocity, width, self.ticks) for x, velocity, width
+                  in zip(self.x[hits].tolist(), self.velocity[hits].tolist(), self.width[hits].tolist())]
+        lane = self.rows.get(row)
+        if scheduled and lane is not None:
+            motion.extend(lane.get_scheduled_motion(self.ticks))
+        return motion
+
+    def sync_lanes(self):
+        """Bring every lane's cars/logs up to date, copying the array state back into the lanes in the window"""
+        by_row = {}
+        for lane in self.lanes:
+            row = self.row_of(lane.rect.y)
+            if row in self.array_rows:
+                lane.release_obstacles()
+                by_row[row] = lane
+            else:
+                super().sync_lane(lane)
+        self._restore_obstacles(by_row, range(self.count))
+
+    def _restore_obstacles(self, by_row, hits):
+        """Append the array obstacles at the indices in hits to their lanes in by_row as Car/Log objects"""
+        for i in hits:
+            lane = by_row[int(self.row[i])]
+            speed = int(self.speed[i]) if self.speed[i].is_integer() else float(self.speed[i])
+            x = int(self.x[i]) if self.x[i].is_integer() else float(self.x[i])
+            direction = int(self.direction[i])
+            if self.is_car[i]:
+                obstacle = self.pool.acquire(lane.car_class, x, lane.rect.y + 2, speed, direction)
+                lane.cars.append(obstacle)
+            else:
+                obstacle = self.pool.acquire(lane.log_class, x, lane.rect.y + 2, speed, direction)
+                lane.logs.append(obstacle)
+            obstacle.spawn_tick = self.ticks  # Its motion is known from where it is now
+
+def play(world, seed, ticks, hop_every, prepare=False):
+    """
+    Keep hopping forward for ticks, a fresh world replacing a dead one, returns a trace of the game
+
+    The trace holds each death and, every 50 ticks, the position of every car and log. With
+    prepare, each next world is built by prepare_in_background before the reset.
+    """
+    trace = []
+    for tick in range(ticks):
+        if tick % hop_every == 0:
+            world.move(0, -1)
+        if world.step():
+            trace.append((tick, world.death_cause, world.player.score))
+            if prepare:
+                world.prepare_in_background(seed + tick)
+            world.reset(seed + tick)
+        if tick % 50 == 0:
+            world.lane_manager.sync_lanes()
+            trace.append(sorted((lane.rect.y, o.x) for lane in world.lane_manager.lanes
+                                for o in lane.cars + lane.logs))
+    return trace
+
+
+def compare_engines(seed=0, ticks=5000, hop_every=12):
+    """Run both engines side by side with the same seed and inputs, return the tick rates"""
+    worlds = {}
+    rates = {}
+    for name, manager_class in (('object', LaneManager), ('array', ArrayLaneManager)):
+        world = World(lane_manager_class=manager_class, seed=seed)
+        start = time.perf_counter()
+        worlds[name] = play(world, seed, ticks, hop_every)
+        rates[name] = ticks / (time.perf_counter() - start)
+
+    if worlds['object'] != worlds['array']:
+        raise AssertionError('Array engine diverged from the object engine')
+    return rates
+
+
+def lane_state(lane):
+    """Everything about a lane that later ticks depend on"""
+    return (lane.ticks, [(o.x, o.spawn_x, o.spawn_tick) for o in lane.cars + lane.logs],
+            list(lane.spawn_schedule), lane.rng.getstate())
+
+
+def check_shortcuts(seed=0, ticks=5000, hop_every=12):
+    """
+    Check that the object engine's shortcuts play exactly the same games as doing without them
+
+    Lane.fast_forward is compared with calling update() once per tick, a LaneManager that only
+    updates the lanes in its active window with an EveryLaneManager (every lane it keeps, above
+    and below the screen, updated on every tick), and
+    World.reset with prepare_in_background followed by reset. Raises AssertionError on any
+    difference.
+    """
+    stepped = LaneManager(seed=seed)
+    forwarded = LaneManager(seed=seed)
+    for stepped_lane, forwarded_lane in zip(stepped.lanes, forwarded.lanes):
+        for skip in (1, 7, 60, 500, 2000):
+            for _ in range(skip):
+                stepped_lane.update()
+            forwarded_lane.fast_forward(forwarded_lane.ticks + skip)
+            if lane_state(stepped_lane) != lane_state(forwarded_lane):
+                raise AssertionError(f'Lane.fast_forward diverged from update() in the {stepped_lane.type} '
+                                     f'lane at y {stepped_lane.rect.y} by lane tick {stepped_lane.ticks}')
+
+    traces = [play(World(lane_manager_class=manager_class, seed=seed), seed, ticks, hop_every)
+              for manager_class in (LaneManager, EveryLaneManager)]
+    if traces[0] != traces[1]:
+        raise AssertionError('Updating only the active window diverged from updating every lane')
+
+    traces = [play(World(seed=seed), seed, ticks, hop_every, prepare) for prepare in (False, True)]
+    if traces[0] != traces[1]:
+        raise AssertionError('prepare_in_background diverged from a plain reset')
+
+
+if __name__ == "__main__":
+    rates = compare_engines()
+    print(f"Engines match. object: {rates['object']:.0f} ticks/s, array: {rates['array']:.0f} ticks/s")
+    check_shortcuts()
+    print('Shortcuts match: fast_forward, the active window and prepare_in_background')